@@ -0,0 +1,37 @@
+import argparse
+import asyncio
+
+
+async def serve(service_time=0.0, host="127.0.0.1"):
+    """Echo every line back after service_time seconds; print the port once listening."""
+    async def handle(reader, writer):
+        try:
+            while line := await reader.readline():
+                if service_time:
+                    await asyncio.sleep(service_time)
+                writer.write(line)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, 0)
+    print(server.sockets[0].getsockname()[1], flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stand-in backend for live.py: a line echo server.")
+    parser.add_argument("--service-time", type=float, default=0.0,
+                        help="seconds spent on each request")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.service_time))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+from model import LoadBalancerModel
+from placement import PLACEMENTS, imbalance
+from profiling import Profiler, PHASES
+import argparse
+import datetime
+import json
+import math
+import platform
+import random
+import statistics
+import subprocess
+import time
+
+HELPERS = ("balance_load", "request_users_from_others",
+           "distribute_users_and_terminate", "clean_user_agents")
+
+
+def build_model(users, servers, seed, placement="random"):
+    """Build a model that holds about `users` users on `servers` servers.
+
+    Capacity is sized for roughly half load, so servers neither overflow
+    nor drop below the termination threshold in steady state.
+    """
+    random.seed(seed)  # Also drives bench_helpers' own picks
+    capacity = max(4, math.ceil(2 * users / servers))
+    return LoadBalancerModel(
+        seed=seed,
+        initial_users=users,
+        initial_servers=servers,
+        max_server_capacity=capacity,
+        min_users=users,
+        max_users=users,
+        user_spawn_chance=0.5,
+        verbose=False,
+        placement=placement,
+    )
+
+
+def describe(samples):
+    """Summarize a list of durations in microseconds."""
+    ordered = sorted(samples)
+    return {
+        "mean_us": statistics.fmean(ordered) * 1e6,
+        "median_us": statistics.median(ordered) * 1e6,
+        "p95_us": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1e6,
+        "count": len(ordered),
+    }
+
+
+def bench_step(users, servers, steps, warmup, seed):
+    """Measure step throughput and per-phase latency for one size."""
+    model = build_model(users, servers, seed)
+    for _ in range(warmup):
+        model.step()
+
+    model.profiler = profiler = Profiler(samples=True)
+    start = time.perf_counter()
+    for _ in range(steps):
+        model.step()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "users": users,
+        "servers": servers,
+        "steps": steps,
+        "steps_per_sec": steps / elapsed,
+        "final_users": model.get_user_count(),
+        "final_servers": model.active_server_count,
+        "phases": {phase: describe([ns / 1e9 for ns in profiler.samples[phase]])
+                   for phase in PHASES},
+        "counters": profiler.counters(model),
+    }
+
+
+def bench_helpers(users, servers, repeats, seed):
+    """Time the hot ServerAgent/model helpers on a warmed-up model."""
+    model = build_model(users, servers, seed)
+    for _ in range(10):
+        model.step()
+    clock = time.perf_counter
+    timings = {helper: [] for helper in HELPERS}
+
+    for _ in range(repeats):
+        # balance_load: place a fresh user, then retire it again
+        user = model.spawn_user()
+        server = random.choice(model.server_agents)
+        t0 = clock()
+        server.balance_load(user)
+        timings["balance_load"].append(clock() - t0)
+        user.die()
+        model.clean_user_agents()
+
+        # request_users_from_others: ask for a quarter of a server's capacity
+        server = random.choice(model.server_agents)
+        t0 = clock()
+        server.request_users_from_others(max(1, server.max_capacity // 4))
+        timings["request_users_from_others"].append(clock() - t0)
+
+        # distribute_users_and_terminate: spin up a server, hand it users, shut it down
+        server = model.spawn_server()
+        for donor in random.sample(model.server_agents[:-1],
+                                   min(len(model.server_agents) - 1, 3)):
+            if donor.connected_users:
+                server.transfer_user(donor.connected_users.choice(), donor)
+        t0 = clock()
+        server.distribute_users_and_terminate()
+        timings["distribute_users_and_terminate"].append(clock() - t0)
+
+        # clean_user_agents: drop a batch of deaths, then refill
+        victims = random.sample(list(model.user_agents), min(10, model.get_user_count()))
+        for victim in victims:
+            victim.die()
+        t0 = clock()
+        model.clean_user_agents()
+        timings["clean_user_agents"].append(clock() - t0)
+        for _ in victims:
+            model.spawn_user()
+
+    return {
+        "users": users,
+        "servers": servers,
+        "helpers": {helper: describe(timings[helper]) for helper in HELPERS},
+    }
+
+
+def bench_placement(users, servers, steps, warmup, seed, placement):
+    """Measure one placement policy: decision cost, imbalance and the churn it causes."""
+    model = build_model(users, servers, seed, placement)
+    for _ in range(warmup):
+        model.step()
+    before = (model.total_transfers, model.total_rejected_requests,
+              model.total_servers_spawned, model.total_servers_died)
+    policy = model.placement
+    policy.decisions = policy.total_ns = policy.max_ns = 0
+    spreads = []
+    for _ in range(steps):
+        model.step()
+        spreads.append(imbalance(model))
+    transfers, rejected, spawned, died = (
+        after - start for after, start in zip(
+            (model.total_transfers, model.total_rejected_requests,
+             model.total_servers_spawned, model.total_servers_died), before))
+    return {
+        "users": users,
+        "servers": servers,
+        "placement": placement,
+        **policy.stats(),
+        "mean_max_over_mean": statistics.fmean(spread[0] for spread in spreads),
+        "mean_cv": statistics.fmean(spread[1] for spread in spreads),
+        "transfers": transfers,
+        "rejected_requests": rejected,
+        "servers_spawned": spawned,
+        "servers_died": died,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(user_counts, server_counts, steps=200, warmup=20, repeats=50, seed=0,
+              placements=()):
+    """Run the full step, helper and placement matrix and return a JSON-ready dict."""
+    results = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "step": [],
+        "helpers": [],
+        "placement": [],
+    }
+    for users in user_counts:
+        for servers in server_counts:
+            results["step"].append(bench_step(users, servers, steps, warmup, seed))
+            results["helpers"].append(bench_helpers(users, servers, repeats, seed))
+            for placement in placements:
+                results["placement"].append(
+                    bench_placement(users, servers, steps, warmup, seed, placement))
+    return results
+
+
+def parse_counts(text):
+    return [int(value) for value in text.split(",")]
+
+
+def parse_placements(text):
+    names = [name for name in text.split(",") if name]
+    for name in names:
+        if name not in PLACEMENTS:
+            raise argparse.ArgumentTypeError(f"unknown placement {name!r}")
+    return names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark LoadBalancerModel.step and its hot helpers.")
+    parser.add_argument("--users", type=parse_counts, default=[100, 1000, 10000])
+    parser.add_argument("--servers", type=parse_counts, default=[4, 40, 400])
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--placements", type=parse_placements, default=list(PLACEMENTS),
+                        help="placement policies to compare (empty to skip)")
+    parser.add_argument("--out", default="benchmark.json")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.users, args.servers, steps=args.steps,
+                        warmup=args.warmup, repeats=args.repeats, seed=args.seed,
+                        placements=args.placements)
+    with open(args.out, "w") as file:
+        json.dump(results, file, indent=2)
+
+    for row in results["step"]:
+        phases = ", ".join(f"{phase} {row['phases'][phase]['mean_us']:.0f}us"
+                           for phase in PHASES)
+        print(f"users={row['users']:>7} servers={row['servers']:>5} "
+              f"{row['steps_per_sec']:9.1f} steps/s  ({phases})")
+    for row in results["placement"]:
+        print(f"users={row['users']:>7} servers={row['servers']:>5} {row['placement']:>17} "
+              f"{row['mean_ns']:8.0f}ns/decision  max/mean {row['mean_max_over_mean']:.2f}  "
+              f"transfers {row['transfers']:>6}  rejected {row['rejected_requests']:>6}")
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from collections import deque
+from model import LoadBalancerModel
+import pickle
+import zlib
+
+# Checkpoints are pickled: only load files you trust.
+
+
+def dumps(model, level=1):
+    """Serialize a model's state to compressed bytes."""
+    return zlib.compress(pickle.dumps(model.get_state(), pickle.HIGHEST_PROTOCOL), level)
+
+
+def loads(data, **params):
+    """Build a model from dumps() bytes; params override stored parameters."""
+    return LoadBalancerModel.from_state(pickle.loads(zlib.decompress(data)), **params)
+
+
+def save(model, path):
+    """Write a checkpoint of model to path."""
+    with open(path, "wb") as file:
+        file.write(dumps(model))
+
+
+def load(path, **params):
+    """Build a model from a checkpoint file written by save()."""
+    with open(path, "rb") as file:
+        return loads(file.read(), **params)
+
+
+class CheckpointRing:
+    """The last maxlen checkpoints of a run, taken every `every` steps (0 never)."""
+
+    def __init__(self, maxlen=32, every=10):
+        self.every = every
+        self.checkpoints = deque(maxlen=maxlen)  # (step, bytes), oldest first
+
+    def record(self, model):
+        """Checkpoint model now, replacing any checkpoint of the same step."""
+        if self.checkpoints and self.checkpoints[-1][0] >= model.step_count:
+            self.discard_from(model.step_count)
+        self.checkpoints.append((model.step_count, dumps(model)))
+
+    def maybe_record(self, model):
+        """Checkpoint model if its step is due and not yet recorded."""
+        if self.every and model.step_count % self.every == 0 and (
+                not self.checkpoints or self.checkpoints[-1][0] != model.step_count):
+            self.record(model)
+
+    def discard_from(self, step):
+        """Drop checkpoints taken at or after step."""
+        while self.checkpoints and self.checkpoints[-1][0] >= step:
+            self.checkpoints.pop()
+
+    def rewind(self, step, **params):
+        """Restore the newest checkpoint taken before step, or None.
+
+        Later checkpoints are dropped, so repeated rewinds go further back.
+        """
+        if not self.checkpoints or self.checkpoints[0][0] >= step:
+            return None
+        self.discard_from(step)
+        return loads(self.checkpoints[-1][1], **params)
+
+    def steps(self):
+        return [step for step, _ in self.checkpoints]
+
+    def __len__(self):
+        return len(self.checkpoints)
@@ -0,0 +1,55 @@
+from collections import namedtuple
+
+# The first broken invariant: where it was seen and the two counts that disagree
+Inconsistency = namedtuple("Inconsistency", "step operation invariant expected actual")
+
+
+class ConsistencyChecker:
+    """O(1) invariant checks over counts the model keeps incrementally.
+
+    Each invariant compares two independently kept counts, so a check
+    never scans users or servers:
+    - connections: users holding a connection (the users' own ledger)
+      against total_connected_users (kept by the servers)
+    - users: live users against spawned minus died
+    - servers: active_server_count against servers_by_id
+
+    By default the model checks once per step. every_operation=True
+    also checks after each operation that changes a count, so the first
+    inconsistency names the operation as well as the step. With
+    strict=True an inconsistency raises AssertionError. Otherwise only
+    the first one is recorded and the rest are counted.
+    """
+
+    def __init__(self, every_operation=False, strict=False):
+        self.every_operation = every_operation
+        self.strict = strict
+        self.checks = 0
+        self.violations = 0
+        self.first = None  # Inconsistency
+
+    @staticmethod
+    def invariants(model):
+        live_users = len(model.user_agents) - len(model.dead_users)
+        expected_users = (model.total_users_spawned + model.users_spawned_this_step
+                          - model.total_users_died - model.users_died_this_step)
+        return (
+            ("connections", model.users_connected, model.total_connected_users),
+            ("users", expected_users, live_users),
+            ("servers", len(model.servers_by_id), model.active_server_count),
+        )
+
+    def check(self, model, operation):
+        """Check every invariant after operation; return the first broken one, or None."""
+        self.checks += 1
+        for invariant, expected, actual in self.invariants(model):
+            if expected != actual:
+                found = Inconsistency(model.step_count, operation, invariant, expected, actual)
+                self.violations += 1
+                if self.first is None:
+                    self.first = found
+                if self.strict:
+                    raise AssertionError(f"{invariant} mismatch after {operation} at step "
+                                         f"{found.step}: expected {expected}, got {actual}")
+                return found
+        return None
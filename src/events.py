@@ -0,0 +1,154 @@
+from collections import deque, namedtuple
+import json
+import sys
+
+# Levels
+DEBUG = 10
+INFO = 20
+
+# Event kinds
+COMM = "COMM"            # User asks a server for a connection
+COLLAB = "COLLAB"        # Server asks others for users
+TRANSFER = "TRANSFER"    # User moved between servers
+NEGO = "NEGO"            # Server negotiates its shutdown
+BUTTERFLY = "BUTTERFLY"  # Manual perturbation
+CONNECT = "CONNECT"      # Server accepted a user
+GREETING = "GREETING"    # User greeted its server
+SPAWN = "SPAWN"          # New server started
+STEP = "STEP"            # End of step summary
+
+LEVELS = {
+    COMM: INFO,
+    COLLAB: INFO,
+    TRANSFER: INFO,
+    NEGO: INFO,
+    BUTTERFLY: INFO,
+    CONNECT: DEBUG,
+    GREETING: DEBUG,
+    SPAWN: DEBUG,
+    STEP: DEBUG,
+}
+
+# user/server/target are agent ids; count is a user count; data is free-form
+Event = namedtuple("Event", "kind step user server target count data",
+                   defaults=(None, None, None, None, None))
+
+
+def format_event(event):
+    """Render an event as the human readable log line."""
+    kind = event.kind
+    if kind == COMM:
+        if event.user is None:
+            return f"COMM: {event.count} users requesting connections"
+        return f"COMM: User {event.user} requesting connection to Server {event.server}"
+    if kind == COLLAB:
+        return f"COLLAB: Server {event.server} requesting {event.count} users"
+    if kind == TRANSFER:
+        if event.user is None:
+            return f"TRANSFER: {event.count} users moved"
+        return f"TRANSFER: User {event.user} from S{event.server} to S{event.target}"
+    if kind == NEGO:
+        return f"NEGO: Server {event.server} negotiating shutdown"
+    if kind == BUTTERFLY:
+        return (f"BUTTERFLY: Small change - User {event.user} "
+                f"disconnected from Server {event.server}")
+    if kind == CONNECT:
+        return f"CONNECT: User {event.user} connected to Server {event.server}"
+    if kind == GREETING:
+        return f"Server {event.server} received message from User {event.user}"
+    if kind == SPAWN:
+        return f"Spawning server with {event.server}"
+    if kind == STEP:
+        return "\n".join([f"\nStep {event.step}:"]
+                         + [f"{key}: {value}" for key, value in event.data.items()])
+    return f"{kind}: {event._asdict()}"
+
+
+class EventBus:
+    """Dispatches structured events to sinks, gated by level.
+
+    Call sites check enabled(kind) before building an event, so a kind
+    no sink listens to costs one set lookup and nothing is formatted.
+    """
+
+    def __init__(self):
+        self.step = 0
+        self._sinks = []  # (sink, min level)
+        self._enabled = frozenset()
+
+    def subscribe(self, sink, level=INFO):
+        """Send events at or above level to sink (a callable)."""
+        self._sinks.append((sink, level))
+        self._refresh()
+
+    def unsubscribe(self, sink):
+        self._sinks = [(s, level) for s, level in self._sinks if s is not sink]
+        self._refresh()
+
+    def _refresh(self):
+        if not self._sinks:
+            self._enabled = frozenset()
+            return
+        lowest = min(level for _, level in self._sinks)
+        self._enabled = frozenset(kind for kind, level in LEVELS.items() if level >= lowest)
+
+    def enabled(self, kind):
+        return kind in self._enabled
+
+    def emit(self, kind, **fields):
+        """Build an event for the current step and dispatch it."""
+        event = Event(kind, self.step, **fields)
+        level = LEVELS[kind]
+        for sink, min_level in self._sinks:
+            if level >= min_level:
+                sink(event)
+
+
+class RingBufferSink:
+    """Keeps the last maxlen events."""
+
+    def __init__(self, maxlen=16):
+        self.events = deque(maxlen=maxlen)
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def messages(self):
+        return [format_event(event) for event in self.events]
+
+
+class MemorySink:
+    """Keeps every event; for tests and short runs."""
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+
+class FileSink:
+    """Writes events as JSON lines, or as text lines if text=True."""
+
+    def __init__(self, path, text=False):
+        self.file = open(path, "w")
+        self.text = text
+
+    def __call__(self, event):
+        if self.text:
+            self.file.write(format_event(event) + "\n")
+        else:
+            self.file.write(json.dumps(event._asdict(), default=str) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class ConsoleSink:
+    """Prints formatted events to stdout."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def __call__(self, event):
+        print(format_event(event), file=self.stream)
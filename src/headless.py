@@ -0,0 +1,244 @@
+from model import LoadBalancerModel, SCHEDULERS
+from vectorized import VectorizedLoadBalancerModel
+from events import RingBufferSink, FileSink, INFO, DEBUG
+from metrics import MetricsCollector, WRITERS
+from timers import BACKOFFS
+from placement import PLACEMENTS, imbalance
+from profiling import Profiler
+from consistency import ConsistencyChecker
+import checkpoint
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import time
+
+
+ENGINES = ("agents", "vectorized")
+
+
+def create_model(engine="agents", seed=None, **model_params):
+    """Build a model for the chosen engine from LoadBalancerModel parameters."""
+    if engine == "agents":
+        return LoadBalancerModel(seed=seed, **model_params)
+    if engine == "vectorized":
+        return VectorizedLoadBalancerModel(seed=seed, **model_params)
+    raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+
+
+def utilization(model):
+    """Share of active server capacity in use."""
+    capacity = model.active_server_count * model.max_server_capacity
+    return model.total_connected_users / capacity if capacity else 0.0
+
+
+def summarize(model):
+    """Collect the final metrics of a model run."""
+    return {
+        "steps": model.step_count,
+        "users": model.get_user_count(),
+        "connected_users": model.total_connected_users,
+        "active_servers": model.active_server_count,
+        "utilization": utilization(model),
+        "users_spawned": model.total_users_spawned,
+        "users_died": model.total_users_died,
+        "servers_spawned": model.total_servers_spawned,
+        "servers_died": model.total_servers_died,
+        "rejected_requests": model.total_rejected_requests,
+        "transfers": model.total_transfers,
+    }
+
+
+def run_headless(steps=1000, seed=None, sinks=(), engine="agents", resume=None,
+                 **model_params):
+    """Run the model without a display and report throughput.
+
+    sinks is a sequence of (sink, level) pairs subscribed to the model's
+    event bus. Extra keyword arguments are passed to the model constructor.
+    resume is a checkpoint file to continue from instead of building a
+    fresh model; keyword arguments then override its stored parameters,
+    and a seed re-seeds its RNG.
+    """
+    model_params.setdefault("verbose", False)
+    if resume is not None:
+        if engine != "agents":
+            raise ValueError("Only the agents engine supports checkpoints")
+        model = checkpoint.load(resume, **model_params)
+        if seed is not None:
+            model.random.seed(seed)
+    else:
+        model = create_model(engine, seed=seed, **model_params)
+    for sink, level in sinks:
+        model.events.subscribe(sink, level)
+
+    placement = getattr(model, "placement", None)  # Agents engine only
+    utilization_sum = imbalance_sum = elapsed = 0.0
+    clock = time.perf_counter
+    for _ in range(steps):
+        start = clock()
+        model.step()
+        elapsed += clock() - start  # Only the step counts towards steps/sec
+        utilization_sum += utilization(model)
+        if placement is not None:
+            imbalance_sum += imbalance(model)[0]
+
+    results = summarize(model)
+    results["mean_utilization"] = utilization_sum / steps if steps else 0.0
+    if placement is not None:
+        stats = placement.stats()
+        results["placement_mean_ns"] = stats["mean_ns"]
+        results["placement_max_ns"] = stats["max_ns"]
+        results["mean_imbalance"] = imbalance_sum / steps if steps else 0.0
+    results["elapsed"] = elapsed
+    results["steps_per_sec"] = steps / elapsed if elapsed > 0 else float("inf")
+    return model, results
+
+
+def parse_step_range(text):
+    """Parse 'START:STOP' into range(START, STOP)."""
+    start, _, stop = text.partition(":")
+    return range(int(start), int(stop))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the load balancer simulation without a display.")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--engine", choices=ENGINES, default="agents")
+    parser.add_argument("--scheduler", choices=sorted(SCHEDULERS), default="fixed",
+                        help="agent engine only: fixed time-stepping or event-driven")
+    parser.add_argument("--backoff", choices=sorted(BACKOFFS), default="fixed",
+                        help="agent engine only: retry backoff after a disconnection")
+    parser.add_argument("--messaging", choices=("direct", "mailbox"), default="direct",
+                        help="agent engine only: direct calls or batched mailbox delivery")
+    parser.add_argument("--latency", type=int, default=0,
+                        help="agent engine only: mailbox link latency in steps")
+    parser.add_argument("--server-phase", choices=("serial", "two_phase"), default="serial",
+                        help="agent engine only: step servers serially or propose/commit")
+    parser.add_argument("--rebalance", choices=("greedy", "bulk"), default="greedy",
+                        help="agent engine only: per-server pulls or one planned pass per step")
+    parser.add_argument("--proposal-workers", type=int, default=0,
+                        help="two_phase only: processes computing proposals (0 = inline)")
+    parser.add_argument("--placement", choices=sorted(PLACEMENTS), default="random",
+                        help="agent engine only: how users pick the server they ask")
+    parser.add_argument("--initial-users", type=int, default=20)
+    parser.add_argument("--initial-servers", type=int, default=4)
+    parser.add_argument("--max-server-capacity", type=int, default=10)
+    parser.add_argument("--min-users", type=int, default=10)
+    parser.add_argument("--max-users", type=int, default=100)
+    parser.add_argument("--user-spawn-chance", type=float, default=0.5)
+    parser.add_argument("--log-buffer", type=int, default=0,
+                        help="keep the last N events and print them (0 drops them)")
+    parser.add_argument("--event-log", default=None,
+                        help="write events as JSON lines to this file")
+    parser.add_argument("--debug-events", action="store_true",
+                        help="include debug-level events in the event log")
+    parser.add_argument("--metrics-out", default=None,
+                        help="stream per-step metrics to this CSV prefix or NPZ directory")
+    parser.add_argument("--metrics-format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--metrics-retention", type=int, default=1024,
+                        help="steps of metrics kept in memory")
+    parser.add_argument("--verbose", action="store_true",
+                        help="print the per-step summary")
+    parser.add_argument("--check", choices=("off", "step", "operation"), default="step",
+                        help="agent engine only: O(1) consistency checks per step or per operation")
+    parser.add_argument("--profile", action="store_true",
+                        help="agent engine only: print per-phase times and hot-path counters")
+    parser.add_argument("--cprofile", type=parse_step_range, default=None, metavar="START:STOP",
+                        help="agent engine only: run cProfile over these steps and print the top calls")
+    parser.add_argument("--resume", default=None,
+                        help="agent engine only: continue from this checkpoint file; "
+                             "model parameter flags are ignored")
+    parser.add_argument("--checkpoint-out", default=None,
+                        help="agent engine only: save a checkpoint here after the run")
+    args = parser.parse_args(argv)
+
+    sinks = []
+    ring = RingBufferSink(args.log_buffer) if args.log_buffer else None
+    if ring:
+        sinks.append((ring, INFO))
+    file_sink = FileSink(args.event_log) if args.event_log else None
+    if file_sink:
+        sinks.append((file_sink, DEBUG if args.debug_events else INFO))
+    writers = [WRITERS[args.metrics_format](args.metrics_out)] if args.metrics_out else []
+    metrics = MetricsCollector(retention=args.metrics_retention, writers=writers)
+    model_params = {}
+    if args.engine == "agents":
+        model_params = {"scheduler": args.scheduler, "backoff": BACKOFFS[args.backoff](),
+                        "messaging": args.messaging, "latency": args.latency,
+                        "server_phase": args.server_phase, "placement": args.placement,
+                        "rebalance": args.rebalance}
+    model_params.update(
+        initial_users=args.initial_users,
+        initial_servers=args.initial_servers,
+        max_server_capacity=args.max_server_capacity,
+        min_users=args.min_users,
+        max_users=args.max_users,
+        user_spawn_chance=args.user_spawn_chance,
+    )
+    if (args.resume or args.checkpoint_out) and args.engine != "agents":
+        parser.error("--resume and --checkpoint-out need --engine agents")
+    if args.resume:
+        model_params = {}  # The checkpoint carries its own parameters
+    pool = None
+    if args.proposal_workers:
+        if args.engine != "agents" or args.server_phase != "two_phase":
+            parser.error("--proposal-workers needs --engine agents and --server-phase two_phase")
+        pool = model_params["proposal_pool"] = ProcessPoolExecutor(args.proposal_workers)
+    checker = None
+    if args.engine == "agents" and args.check != "off":
+        checker = model_params["checker"] = ConsistencyChecker(
+            every_operation=args.check == "operation")
+    profiler = None
+    if args.profile or args.cprofile is not None:
+        if args.engine != "agents":
+            parser.error("--profile and --cprofile need --engine agents")
+        profiler = model_params["profiler"] = Profiler(cprofile_steps=args.cprofile)
+    model, results = run_headless(
+        **model_params,
+        steps=args.steps,
+        seed=args.seed,
+        sinks=sinks,
+        metrics=metrics,
+        engine=args.engine,
+        resume=args.resume,
+        verbose=args.verbose,
+    )
+    if args.checkpoint_out:
+        checkpoint.save(model, args.checkpoint_out)
+    if pool:
+        pool.shutdown()
+
+    for key, value in results.items():
+        if isinstance(value, float):
+            print(f"{key}: {value:.4f}")
+        else:
+            print(f"{key}: {value}")
+    if checker:
+        print(f"consistency_checks: {checker.checks}")
+        print(f"inconsistencies: {checker.violations}")
+        if checker.first:
+            first = checker.first
+            print(f"first_inconsistency: {first.invariant} after {first.operation} at step "
+                  f"{first.step} (expected {first.expected}, got {first.actual})")
+    if profiler:
+        report = profiler.report(model)
+        print("\nPhases:")
+        for phase, times in report["phases"].items():
+            print(f"  {phase}: {times['total_ms']:.1f} ms total, {times['mean_us']:.1f} us/step")
+        print("Counters:")
+        for name, count in report["counters"].items():
+            print(f"  {name}: {count}")
+        if args.cprofile is not None:
+            print()
+            print(profiler.cprofile_stats())
+    metrics.close()
+    if file_sink:
+        file_sink.close()
+    if ring:
+        print("\nRecent events:")
+        for msg in ring.messages():
+            print(msg)
+
+
+if __name__ == "__main__":
+    main()
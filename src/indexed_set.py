@@ -0,0 +1,62 @@
+import random
+
+
+class IndexedSet:
+    """Set with O(1) add, remove, membership and uniform random choice.
+
+    Items live in a compact list; a dict maps each item to its position.
+    Removal swaps the last item into the freed slot, so iteration order
+    is not insertion order once items have been removed.
+    """
+
+    def __init__(self, items=()):
+        self._items = []
+        self._index = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        """Add an item; do nothing if it is already present."""
+        if item in self._index:
+            return
+        self._index[item] = len(self._items)
+        self._items.append(item)
+
+    def remove(self, item):
+        """Remove an item, raising KeyError if it is missing."""
+        pos = self._index.pop(item)
+        last = self._items.pop()
+        if last is not item:
+            self._items[pos] = last
+            self._index[last] = pos
+
+    def discard(self, item):
+        """Remove an item if it is present."""
+        if item in self._index:
+            self.remove(item)
+
+    def choice(self, rng=random):
+        """Return a uniformly random item."""
+        if not self._items:
+            raise IndexError("choice from an empty IndexedSet")
+        return self._items[rng.randrange(len(self._items))]
+
+    def clear(self):
+        self._items.clear()
+        self._index.clear()
+
+    def __getitem__(self, index):
+        """Return the item (or list of items for a slice) at a position."""
+        return self._items[index]
+
+    def __contains__(self, item):
+        return item in self._index
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __repr__(self):
+        return f"IndexedSet({self._items!r})"
@@ -0,0 +1,243 @@
+from headless import summarize
+from model import LoadBalancerModel
+from placement import PLACEMENTS
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend.py")
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Backend:
+    """A backend.py process standing in for one ServerAgent."""
+
+    def __init__(self, server_id, service_time=0.0):
+        self.server_id = server_id
+        self.service_time = service_time
+        self.process = None
+        self.port = asyncio.get_running_loop().create_future()
+        self.started = asyncio.create_task(self.start())
+
+    async def start(self):
+        start = time.perf_counter()
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, BACKEND, "--service-time", str(self.service_time),
+            stdout=asyncio.subprocess.PIPE)
+        self.port.set_result(int(await self.process.stdout.readline()))
+        self.startup = time.perf_counter() - start
+
+    async def connect(self, host):
+        return await asyncio.open_connection(host, await self.port)
+
+    async def stop(self):
+        await self.started
+        self.process.terminate()
+        await self.process.wait()
+
+
+class LiveBalancer:
+    """Runs the agent model against real sockets on this machine.
+
+    Every active ServerAgent is fronted by a local backend process, and
+    every connected UserAgent is a TCP client sending request lines to a
+    proxy. The model keeps making every decision. For each request the
+    proxy forwards the line to the backend of the user's server, so
+    when the model moves a user the client's traffic migrates with it.
+    After each model step, backends are started for spawned servers and
+    stopped for terminated ones.
+    """
+
+    def __init__(self, model, host="127.0.0.1", think_time=0.01, service_time=0.0):
+        self.model = model
+        self.host = host
+        self.think_time = think_time
+        self.service_time = service_time
+        self.backends = {}  # Server id -> Backend, once it is listening
+        self.starting = {}  # Server id -> Backend still starting up
+        self.startup_times = []  # Seconds each backend took to start
+        self.clients = {}  # User id -> client task
+        self.stopping = []  # Backend.stop tasks
+        self.latencies = []  # Seconds per answered request
+        self.migrations = 0  # Upstream switches after the model moved a user
+        self.errors = 0  # Requests whose backend went away mid-flight
+        self.backends_started = 0
+        self.backends_stopped = 0
+        self.proxy = None
+        self.proxy_port = None
+
+    async def handle_client(self, reader, writer):
+        """Proxy one client: route every request to its user's current backend."""
+        upstream = None
+        server_id = None
+        try:
+            user_id = int(await reader.readline())
+            while line := await reader.readline():
+                user = self.model.schedule._agents.get(user_id)
+                target = user.connected_to if user is not None else None
+                if target in self.starting and upstream is not None:
+                    target = server_id  # Stay on the old backend until the new one is up
+                backend = self.backends.get(target)
+                if backend is None:
+                    break  # Disconnected, dead, or on a server being shut down
+                try:
+                    if target != server_id:
+                        if upstream is not None:
+                            upstream[1].close()
+                            self.migrations += 1
+                        upstream = await backend.connect(self.host)
+                        server_id = target
+                    upstream[1].write(line)
+                    await upstream[1].drain()
+                    reply = await upstream[0].readline()
+                    if not reply:
+                        raise ConnectionResetError
+                except (ConnectionError, OSError):
+                    self.errors += 1
+                    upstream = server_id = None
+                    reply = b"RETRY\n"
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            if upstream is not None:
+                upstream[1].close()
+            writer.close()
+
+    async def client(self, user_id):
+        """A real client for one connected user, timing each round trip."""
+        reader, writer = await asyncio.open_connection(self.host, self.proxy_port)
+        clock = time.perf_counter
+        try:
+            writer.write(f"{user_id}\n".encode())
+            while True:
+                start = clock()
+                writer.write(b"ping\n")
+                await writer.drain()
+                reply = await reader.readline()
+                if not reply:
+                    break
+                if reply != b"RETRY\n":
+                    self.latencies.append(clock() - start)
+                await asyncio.sleep(self.think_time)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def sync(self):
+        """Match backends to active servers, then clients to connected users.
+
+        New backends are started before any user is routed to them, so
+        process start-up never counts as request latency.
+        """
+        servers = {s.unique_id for s in self.model.server_agents if s.active}
+        for server_id in servers - self.backends.keys():
+            self.starting[server_id] = Backend(server_id, self.service_time)
+            self.backends_started += 1
+        if self.starting:
+            await asyncio.gather(*(backend.started for backend in self.starting.values()))
+            for server_id, backend in self.starting.items():
+                self.backends[server_id] = backend
+                self.startup_times.append(backend.startup)
+            self.starting.clear()
+        for server_id in self.backends.keys() - servers:
+            self.stopping.append(asyncio.create_task(self.backends.pop(server_id).stop()))
+            self.backends_stopped += 1
+
+        users = {u.unique_id for u in self.model.user_agents if u.connected_to is not None}
+        for user_id in users:
+            task = self.clients.get(user_id)
+            if task is None or task.done():  # New, or dropped by the proxy
+                self.clients[user_id] = asyncio.create_task(self.client(user_id))
+        for user_id in self.clients.keys() - users:
+            self.clients.pop(user_id).cancel()
+
+    async def run(self, steps, step_interval=0.1):
+        """Step the model steps times, step_interval seconds apart, and return the report."""
+        self.proxy = await asyncio.start_server(self.handle_client, self.host, 0)
+        self.proxy_port = self.proxy.sockets[0].getsockname()[1]
+        start = time.perf_counter()
+        try:
+            await self.sync()
+            for _ in range(steps):
+                await asyncio.sleep(step_interval)
+                self.model.step()
+                await self.sync()
+        finally:
+            elapsed = time.perf_counter() - start
+            for task in self.clients.values():
+                task.cancel()
+            await asyncio.gather(*self.clients.values(), return_exceptions=True)
+            self.proxy.close()
+            await self.proxy.wait_closed()
+            await asyncio.gather(*self.stopping, *(b.stop() for b in self.backends.values()),
+                                 return_exceptions=True)
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        ordered = sorted(self.latencies)
+        results = summarize(self.model)
+        results.update({
+            "elapsed": elapsed,
+            "requests": len(ordered),
+            "requests_per_sec": len(ordered) / elapsed if elapsed > 0 else 0.0,
+            "latency_p50_ms": percentile(ordered, 0.50) * 1e3,
+            "latency_p95_ms": percentile(ordered, 0.95) * 1e3,
+            "latency_p99_ms": percentile(ordered, 0.99) * 1e3,
+            "migrations": self.migrations,
+            "errors": self.errors,
+            "backends_started": self.backends_started,
+            "backends_stopped": self.backends_stopped,
+            "backend_startup_ms": (sum(self.startup_times) / len(self.startup_times) * 1e3
+                                   if self.startup_times else 0.0),
+        })
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Drive real local backends and TCP clients with the agent model.")
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--step-interval", type=float, default=0.1,
+                        help="seconds of real traffic between model steps")
+    parser.add_argument("--think-time", type=float, default=0.01,
+                        help="seconds each client waits between requests")
+    parser.add_argument("--service-time", type=float, default=0.0,
+                        help="seconds each backend spends on a request")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--placement", choices=sorted(PLACEMENTS), default="random")
+    parser.add_argument("--rebalance", choices=("greedy", "bulk"), default="greedy")
+    parser.add_argument("--initial-users", type=int, default=20)
+    parser.add_argument("--initial-servers", type=int, default=4)
+    parser.add_argument("--max-server-capacity", type=int, default=10)
+    parser.add_argument("--min-users", type=int, default=10)
+    parser.add_argument("--max-users", type=int, default=50)
+    parser.add_argument("--user-spawn-chance", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    model = LoadBalancerModel(
+        seed=args.seed, verbose=False, placement=args.placement, rebalance=args.rebalance,
+        initial_users=args.initial_users, initial_servers=args.initial_servers,
+        max_server_capacity=args.max_server_capacity, min_users=args.min_users,
+        max_users=args.max_users, user_spawn_chance=args.user_spawn_chance)
+    balancer = LiveBalancer(model, think_time=args.think_time, service_time=args.service_time)
+    results = asyncio.run(balancer.run(args.steps, args.step_interval))
+    for key, value in results.items():
+        if isinstance(value, float):
+            print(f"{key}: {value:.4f}")
+        else:
+            print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
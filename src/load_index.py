@@ -0,0 +1,77 @@
+import heapq
+import itertools
+
+
+class LoadIndex:
+    """Priority index of active servers keyed by load ratio.
+
+    Backed by a binary heap with lazy invalidation: every update pushes a
+    fresh entry and older entries for the same server are skipped when
+    they reach the top. Updates and least-loaded lookups are O(log n)
+    amortized.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._latest = {}  # server -> sequence number of its live entry
+        self._counter = itertools.count()
+
+    @staticmethod
+    def load_ratio(server):
+        return len(server.connected_users) / server.max_capacity
+
+    def add(self, server):
+        """Start tracking a server."""
+        self._push(server)
+
+    def update(self, server):
+        """Re-key a tracked server after its connections changed."""
+        if server in self._latest:
+            self._push(server)
+
+    def remove(self, server):
+        """Stop tracking a server; its heap entries become stale."""
+        self._latest.pop(server, None)
+
+    def least_loaded(self, exclude=None):
+        """Return the server with the lowest load ratio, or None."""
+        top = self._peek()
+        if top is None or top is not exclude:
+            return top
+        # Set the excluded server aside to look past it
+        entry = heapq.heappop(self._heap)
+        runner_up = self._peek()
+        heapq.heappush(self._heap, entry)
+        return runner_up
+
+    def in_update_order(self):
+        """Return tracked servers, least recently updated first.
+
+        Re-adding servers in this order reproduces how ties are broken.
+        """
+        return sorted(self._latest, key=self._latest.get)
+
+    def _push(self, server):
+        seq = next(self._counter)
+        self._latest[server] = seq
+        heapq.heappush(self._heap, (self.load_ratio(server), seq, server))
+        # Compact once stale entries dominate the heap
+        if len(self._heap) > 4 * len(self._latest) + 64:
+            self._heap = [entry for entry in self._heap
+                          if self._latest.get(entry[2]) == entry[1]]
+            heapq.heapify(self._heap)
+
+    def _peek(self):
+        heap = self._heap
+        while heap:
+            _, seq, server = heap[0]
+            if self._latest.get(server) == seq:
+                return server
+            heapq.heappop(heap)
+        return None
+
+    def __contains__(self, server):
+        return server in self._latest
+
+    def __len__(self):
+        return len(self._latest)
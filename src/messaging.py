@@ -0,0 +1,54 @@
+from collections import namedtuple
+import heapq
+import itertools
+
+# kind is COMM, COLLAB, TRANSFER or NEGO (see events.py); sender and
+# recipient are agent ids; payload is a user id, or a user count for COLLAB
+Message = namedtuple("Message", "kind sender recipient payload deliver_at")
+
+
+class PostOffice:
+    """Per-agent mailboxes with batched delivery and optional link latency.
+
+    send() only queues a message for step now + latency. deliver(now)
+    hands over everything due by then, grouped by recipient, so each
+    agent handles its whole batch at once. Messages due on the same step
+    arrive in send order. Agents are referred to by id, so messages stay
+    plain data and survive checkpoints.
+    """
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self._in_flight = []  # (deliver_at, send order, message)
+        self._counter = itertools.count()
+        self.sent = 0
+        self.delivered = 0
+
+    def send(self, kind, sender, recipient, payload, now):
+        self._queue(Message(kind, sender, recipient, payload, now + self.latency))
+
+    def _queue(self, message):
+        heapq.heappush(self._in_flight, (message.deliver_at, next(self._counter), message))
+        self.sent += 1
+
+    def deliver(self, now):
+        """Return {recipient id: [messages]} for every message due by now."""
+        mailboxes = {}
+        in_flight = self._in_flight
+        while in_flight and in_flight[0][0] <= now:
+            message = heapq.heappop(in_flight)[2]
+            mailboxes.setdefault(message.recipient, []).append(message)
+            self.delivered += 1
+        return mailboxes
+
+    def export(self):
+        """Return the messages in flight, in delivery order."""
+        return tuple(message for _, _, message in sorted(self._in_flight))
+
+    def restore(self, messages):
+        """Queue messages returned by export()."""
+        for message in messages:
+            self._queue(Message(*message))
+
+    def __len__(self):
+        return len(self._in_flight)
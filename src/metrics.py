@@ -0,0 +1,131 @@
+from collections import deque
+import csv
+import os
+import numpy as np
+
+COLUMNS = ("step", "total_users", "connected_users", "active_servers",
+           "new_users", "dead_users", "new_servers", "dead_servers")
+
+TERMINATED = -1  # Load recorded for a server that shut down
+
+
+class MetricsCollector:
+    """Columnar per-step metrics with bounded memory.
+
+    Scalar metrics go into a fixed int64 block per chunk. Per-server
+    loads are stored as sparse (step, server, load) deltas, recorded
+    only for servers whose load changed. Full chunks are handed to the
+    writers and then kept in a bounded history of about `retention`
+    steps. Memory stays flat however long the run is.
+    """
+
+    def __init__(self, retention=1024, chunk_size=256, writers=()):
+        self.chunk_size = chunk_size
+        self.writers = list(writers)
+        self.history = deque(maxlen=max(1, -(-retention // chunk_size)))
+        self.loads = {}  # Server id -> latest load, active servers only
+        self.last = dict.fromkeys(COLUMNS, 0)
+        self._scalars = np.zeros((chunk_size, len(COLUMNS)), dtype=np.int64)
+        self._rows = 0
+        self._deltas = []  # (step, server id, load)
+
+    def collect(self, model):
+        """Record the current step of model."""
+        row = (
+            model.step_count,
+            model.get_user_count(),
+            model.total_connected_users,
+            model.active_server_count,
+            model.users_spawned_this_step,
+            model.users_died_this_step,
+            model.servers_spawned_this_step,
+            model.servers_died_this_step,
+        )
+        self._scalars[self._rows] = row
+        self._rows += 1
+        self.last = dict(zip(COLUMNS, row))
+
+        step = model.step_count
+        for server_id, load in model.pop_load_changes():
+            self._deltas.append((step, server_id, load))
+            if load == TERMINATED:
+                self.loads.pop(server_id, None)
+            else:
+                self.loads[server_id] = load
+
+        if self._rows == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Hand the pending rows to the writers and retire them to history."""
+        if not self._rows and not self._deltas:
+            return
+        chunk = {
+            "scalars": self._scalars[:self._rows].copy(),
+            "deltas": np.array(self._deltas, dtype=np.int64).reshape(-1, 3),
+        }
+        for writer in self.writers:
+            writer.write(chunk)
+        self.history.append(chunk)
+        self._rows = 0
+        self._deltas = []
+
+    def close(self):
+        """Flush and close every writer."""
+        self.flush()
+        for writer in self.writers:
+            writer.close()
+
+    def column(self, name):
+        """Return the retained values of a scalar metric, oldest first."""
+        index = COLUMNS.index(name)
+        parts = [chunk["scalars"][:, index] for chunk in self.history]
+        parts.append(self._scalars[:self._rows, index])
+        return np.concatenate(parts)
+
+    def load_deltas(self):
+        """Return the retained (step, server, load) deltas as one array."""
+        parts = [chunk["deltas"] for chunk in self.history]
+        parts.append(np.array(self._deltas, dtype=np.int64).reshape(-1, 3))
+        return np.concatenate(parts)
+
+
+class CSVMetricsWriter:
+    """Streams chunks to <prefix>_steps.csv and <prefix>_loads.csv."""
+
+    def __init__(self, prefix):
+        self.steps_file = open(f"{prefix}_steps.csv", "w", newline="")
+        self.loads_file = open(f"{prefix}_loads.csv", "w", newline="")
+        self.steps = csv.writer(self.steps_file)
+        self.loads = csv.writer(self.loads_file)
+        self.steps.writerow(COLUMNS)
+        self.loads.writerow(("step", "server", "load"))
+
+    def write(self, chunk):
+        self.steps.writerows(chunk["scalars"].tolist())
+        self.loads.writerows(chunk["deltas"].tolist())
+
+    def close(self):
+        self.steps_file.close()
+        self.loads_file.close()
+
+
+class NPZMetricsWriter:
+    """Writes each chunk as chunk_NNNNNN.npz in a directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, chunk):
+        path = os.path.join(self.directory, f"chunk_{self.count:06d}.npz")
+        columns = {name: chunk["scalars"][:, i] for i, name in enumerate(COLUMNS)}
+        np.savez_compressed(path, deltas=chunk["deltas"], **columns)
+        self.count += 1
+
+    def close(self):
+        pass
+
+
+WRITERS = {"csv": CSVMetricsWriter, "npz": NPZMetricsWriter}
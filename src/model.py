@@ -4,9 +4,21 @@ from mesa.time import RandomActivation
 from mesa.visualization.modules import CanvasGrid, ChartModule
 from mesa.visualization.UserParam import UserSettableParameter
 from mesa.visualization.ModularVisualization import ModularServer
-from mesa.datacollection import DataCollector
-import random
+import copy
+import heapq
+import itertools
+import operator
+from contextlib import nullcontext
 from mesa.time import BaseScheduler
+from indexed_set import IndexedSet
+from load_index import LoadIndex
+from metrics import MetricsCollector, TERMINATED
+from timers import TimerWheel, FixedBackoff
+from messaging import PostOffice
+from two_phase import take_view, propose_many, commit
+from placement import make_placement
+from events import (EventBus, ConsoleSink, DEBUG, COMM, COLLAB, TRANSFER, NEGO,
+                    BUTTERFLY, CONNECT, GREETING, SPAWN, STEP)
 
 
 class UserAgent(Agent):
@@ -16,29 +28,36 @@ class UserAgent(Agent):
         super().__init__(unique_id, model)
         self.myid = unique_id
         self.connected_to = None  # Server ID or None
-        self.steps_to_live = random.randint(10, 20)
+        self.steps_to_live = self.random.randint(10, 20)
         self.steps_alive = 0
         self.connection_requested = False
         self.connection_approved = False
         # self.connection_rejected = False
         self.wait_steps = 0
         self.state = "disconnected"
+        self.alive = True
+        self.retry_attempts = 0  # Disconnections since the last connection
+        self.retry_at = None  # Step the backoff ends, while parked in the retry wheel
 
     def request_connection(self):
         """Request connection to a server."""
-        target_server = random.choice(self.model.server_agents)
-        # NEW COdes
-        msg = f"COMM: User {self.myid} requesting connection to Server {target_server.unique_id}"
-        self.model.visualizer.add_log_message(msg)
-        # End 
+        target_server = self.model.placement.choose(self.model, self)
+        events = self.model.events
+        if events.enabled(COMM):
+            events.emit(COMM, user=self.myid, server=target_server.unique_id)
         self.connection_requested = True
-        target_server.receive_request(self)
+        if self.model.post_office is None:
+            target_server.receive_request(self)
+        else:
+            self.model.post(COMM, self.unique_id, target_server.unique_id, self.unique_id)
         self.state = "requested"
 
-    # Not used currently
     def receive_server_response(self, response):
         """Handle server response to connection request."""
         if response:
+            if self.connected_to is None:
+                self.model.users_connected += 1
+            self.retry_attempts = 0
             self.connection_approved = True
             self.connected_to = response
             self.state = "connected"
@@ -46,16 +65,18 @@ class UserAgent(Agent):
 
     def send_greeting(self):
         """Send a greeting to the server."""
-        if self.connected_to:
-            target_server = next(
-                s for s in self.model.server_agents if s.unique_id == self.connected_to)
+        target_server = self.get_server()
+        if target_server:
             target_server.receive_message(self)
 
     def get_server(self):
         """Get the server this user is connected to."""
         if self.connected_to is None:
             return None
-        return next(s for s in self.model.server_agents if s.unique_id == self.connected_to)
+        profiler = self.model.profiler
+        if profiler is not None:
+            profiler.lookups += 1
+        return self.model.servers_by_id.get(self.connected_to)
 
     def check_connection(self):
         """Check if the connection is still alive."""
@@ -70,12 +91,25 @@ class UserAgent(Agent):
 
     def handle_disconnection(self):
         """Handle disconnection from server."""
+        self.model.schedule.sync(self)
+        if self.connected_to is not None:
+            self.model.users_connected -= 1
         self.connected_to = None
         self.connection_requested = False
         self.connection_approved = False
         # self.connection_rejected = False
         self.state = "disconnected"
-        self.wait_steps = 10
+        self.retry_attempts += 1
+        self.wait_steps = self.model.backoff.delay(self.retry_attempts, self.random)
+        self.model.park_user(self)
+        self.model.schedule.reschedule(self)
+        self.model.audit("handle_disconnection")
+
+    def wake(self):
+        """End the backoff; the user retries on this step."""
+        self.retry_at = None
+        self.wait_steps = 0
+        self.connection_requested = False
 
     def die(self):
         """Die"""
@@ -83,9 +117,13 @@ class UserAgent(Agent):
         server = self.get_server()
         if server:
             server.handle_user_dies(self)
+        if self.connected_to is not None:
+            self.model.users_connected -= 1
+        self.alive = False
         self.model.users_died_this_step += 1
         self.model.schedule.remove(self)
-        self.model.user_agents.remove(self)
+        self.model.dead_users.append(self)  # Dropped from user_agents by clean_user_agents
+        self.model.audit("die")
 
     def step(self):
         """Advance the agent by one step."""
@@ -114,22 +152,50 @@ class ServerAgent(Agent):
     def __init__(self, unique_id, model, max_capacity=10):
         super().__init__(unique_id, model)
         self.max_capacity = max_capacity
-        self.current_load = 0
         self.active = True
-        self.connected_users = []
+        self.connected_users = IndexedSet()
         self.upper_threshold = int(self.max_capacity * 0.6)
+        self.draining = False  # Handing its users off before terminating (mailbox mode)
+        self.pending_handoffs = 0  # NEGO handoffs still in flight
+        self.collab_replies_due = None  # Last step COLLAB replies may arrive (mailbox mode)
+
+    @property
+    def current_load(self):
+        """Connected users; connected_users is the only record of them."""
+        return len(self.connected_users)
+
+    def add_connection(self, user):
+        """Track a connected user and re-key this server's load."""
+        self.connected_users.add(user)
+        self.model.load_index.update(self)
+        self.model.total_connected_users += 1
+        self.model.total_headroom -= 1
+        self.model.changed_servers.add(self)
+
+    def remove_connection(self, user):
+        """Untrack a connected user and re-key this server's load."""
+        self.connected_users.remove(user)
+        self.model.load_index.update(self)
+        self.model.total_connected_users -= 1
+        self.model.total_headroom += 1
+        self.model.changed_servers.add(self)
 
-    def trigger_butterfly_effect(self):
-        """Small change that causes cascading effects."""
+    def trigger_butterfly_effect(self, rng=None):
+        """Small change that causes cascading effects.
+
+        rng picks the user; pass a separate Random to leave the model's
+        own stream untouched.
+        """
         # Small trigger - disconnect one random user
         if self.connected_users:
-            user = random.choice(list(self.connected_users))
-            self.connected_users.remove(user)
+            user = self.connected_users.choice(rng or self.random)
+            self.remove_connection(user)
             user.handle_disconnection()
-            
-            msg = f"BUTTERFLY: Small change - User {user.myid} disconnected from Server {self.unique_id}"
-            self.model.visualizer.add_log_message(msg)
-            
+
+            events = self.model.events
+            if events.enabled(BUTTERFLY):
+                events.emit(BUTTERFLY, user=user.myid, server=self.unique_id)
+
             # This may cause:
             # 1. Server becomes underutilized -> requests users
             # 2. Other servers transfer users -> they become underutilized
@@ -148,18 +214,20 @@ class ServerAgent(Agent):
 
     def request_users_from_others(self, users_needed):
         """Request users from other servers to improve utilization."""
-        # New codes
-        msg = f"COLLAB: Server {self.unique_id} requesting {users_needed} users"
-        self.model.visualizer.add_log_message(msg)
-        # End
-        
+        events = self.model.events
+        if events.enabled(COLLAB):
+            events.emit(COLLAB, server=self.unique_id, count=users_needed)
+
         other_servers = [s for s in self.model.server_agents
                          if s != self and s.active]
+        if self.model.post_office is not None:
+            self.post_collab_requests(users_needed, other_servers)
+            return
 
         # NOTE: Potential infinite loop, handle with care
         while users_needed > 0 and other_servers:
             # Pick random server
-            donor = random.choice(other_servers)
+            donor = self.random.choice(other_servers)
 
             # Check if donor has excess capacity
             donor_users = len(donor.connected_users)
@@ -168,8 +236,8 @@ class ServerAgent(Agent):
             if excess > 0:
                 # Transfer one random user
                 # if donor.connected_users:   # This check is redundant
-                for _ in range(random.randint(0, excess)):
-                    user = random.choice(list(donor.connected_users))
+                for _ in range(self.random.randint(0, excess)):
+                    user = donor.connected_users.choice(self.random)
                     self.transfer_user(user, donor)
                     users_needed -= 1
 
@@ -177,75 +245,191 @@ class ServerAgent(Agent):
             other_servers.remove(donor)
 
 
+    def post_collab_requests(self, users_needed, other_servers):
+        """Mailbox mode: ask donors with spare users until they could cover the need."""
+        self.random.shuffle(other_servers)
+        offered = 0
+        for donor in other_servers:
+            if offered >= users_needed:
+                break
+            excess = len(donor.connected_users) - self.upper_threshold
+            if excess > 0 and not donor.draining:
+                self.post_collab(donor.unique_id, users_needed - offered)
+                offered += excess
+
+    def post_collab(self, donor_id, users_needed):
+        """Mailbox mode: ask a donor for users and wait for its TRANSFER replies."""
+        self.model.post(COLLAB, self.unique_id, donor_id, users_needed)
+        # The request and the replies each take one latency to arrive
+        self.collab_replies_due = self.model.schedule.now + 2 * self.model.latency
+
+    def awaiting_collab(self):
+        """Mailbox mode: True while replies to this server's COLLAB may still arrive."""
+        return (self.collab_replies_due is not None
+                and self.model.schedule.now <= self.collab_replies_due)
+
+    def commit_pulls(self, pulls, users_needed):
+        """Two-phase mode: take the users proposed from each donor, if it still has them."""
+        events = self.model.events
+        if events.enabled(COLLAB):
+            events.emit(COLLAB, server=self.unique_id, count=users_needed)
+        for donor_id, count in pulls:
+            donor = self.model.servers_by_id.get(donor_id)
+            if donor is None or donor.draining:
+                continue
+            if self.model.post_office is not None:
+                self.post_collab(donor_id, count)
+                continue
+            for _ in range(min(count, len(donor.connected_users) - self.upper_threshold)):
+                self.transfer_user(donor.connected_users.choice(self.random), donor)
+
+    def receive_collab(self, requester_id, users_needed):
+        """Mailbox mode: answer a COLLAB request with TRANSFER messages."""
+        if not self.active or self.draining:
+            return
+        excess = len(self.connected_users) - self.upper_threshold
+        if excess <= 0:
+            return
+        count = self.random.randint(0, min(excess, users_needed))
+        users = self.connected_users
+        for index in self.random.sample(range(len(users)), count):
+            self.model.post(TRANSFER, self.unique_id, requester_id, users[index].unique_id)
+
+    def receive_transfer(self, user, from_server):
+        """Mailbox mode: take over a user handed off by from_server, if still valid."""
+        if (self.active and not self.draining and from_server is not None
+                and user.connected_to == from_server.unique_id):
+            self.transfer_user(user, from_server)
+
     def transfer_user(self, user, from_server):
         """Transfer a user from another server to this one."""
-        # New codes
-        msg = f"TRANSFER: User {user.myid} from S{from_server.unique_id} to S{self.unique_id}"
-        self.model.visualizer.add_log_message(msg)
-        # end
+        events = self.model.events
+        if events.enabled(TRANSFER):
+            events.emit(TRANSFER, user=user.myid, server=from_server.unique_id,
+                        target=self.unique_id)
+        self.model.total_transfers += 1
 
         # Remove from old server
-        from_server.connected_users.remove(user)
-        from_server.current_load -= 1
+        from_server.remove_connection(user)
 
         # Add to this server
-        self.connected_users.append(user)
-        self.current_load += 1
+        self.add_connection(user)
 
         # Update user's connection
         user.connected_to = self.unique_id
 
+    def take_users(self, users, from_server):
+        """Bulk rebalancing: take over users from from_server in one batch.
+
+        Cluster totals are unchanged by a move, so only the two servers'
+        own state is touched.
+        """
+        for user in users:
+            from_server.connected_users.remove(user)
+            self.connected_users.add(user)
+            user.connected_to = self.unique_id
+        for server in (from_server, self):
+            self.model.load_index.update(server)
+            self.model.changed_servers.add(server)
+
     def check_severe_underutilization(self):
         """Check if server is severely underutilized."""
         return len(self.connected_users) < (self.max_capacity * 0.3)
 
     def can_others_handle_load(self):
         """Check if other servers can handle current users."""
-        other_servers = [s for s in self.model.server_agents
-                         if s != self and s.active]
-
-        if not other_servers:
+        draining = self.model.draining_servers  # Already on their way out
+        if self.model.active_server_count - len(draining) <= 1:
             return False  # Don't terminate if last server
 
-        total_available = sum(
-            self.upper_threshold - len(s.connected_users)
-            for s in other_servers
-        )
+        # Cluster headroom minus this server's own share
+        own_headroom = self.upper_threshold - len(self.connected_users)
+        total_available = self.model.total_headroom - own_headroom - sum(
+            s.upper_threshold - len(s.connected_users) for s in draining)
         return total_available >= len(self.connected_users)
 
     def distribute_users_and_terminate(self):
-        """Distribute users evenly and terminate self."""
-        # New codes
-        msg = f"NEGO: Server {self.unique_id} negotiating shutdown"
-        self.model.visualizer.add_log_message(msg)
-        # end
-
-        other_servers = [s for s in self.model.server_agents
-                         if s != self and s.active]
+        """Distribute users evenly and terminate self.
+
+        In mailbox mode the users are handed off by NEGO messages instead,
+        and the server terminates once they have all left (see drain).
+        """
+        events = self.model.events
+        if events.enabled(NEGO):
+            events.emit(NEGO, server=self.unique_id)
+
+        # Leave the load index so self is never picked as a target
+        self.model.load_index.remove(self)
+        self.model.placement.remove(self)
+
+        if self.model.post_office is not None:
+            self.draining = True
+            self.model.draining_servers.append(self)
+            self.hand_off_users()
+            return
 
         users_to_distribute = list(self.connected_users)
         while users_to_distribute:
             # Find server with lowest load percentage
-            target_server = min(
-                other_servers,
-                key=lambda s: len(s.connected_users) / s.max_capacity
-            )
+            target_server = self.model.load_index.least_loaded()
 
             # Transfer one user
             user = users_to_distribute.pop()
             target_server.transfer_user(user, self)
+        self.terminate()
+
+    def hand_off_users(self):
+        """Mailbox mode: offer every user to the least loaded servers by NEGO messages."""
+        load_index = self.model.load_index
+        targets = [(load_index.load_ratio(s), i, s)
+                   for i, s in enumerate(self.model.server_agents) if s in load_index]
+        if not targets:
+            return  # Nobody to hand off to yet; retried at the next boundary
+        heapq.heapify(targets)
+        for user in self.connected_users:
+            ratio, i, target = heapq.heappop(targets)
+            self.model.post(NEGO, self.unique_id, target.unique_id, user.unique_id)
+            self.pending_handoffs += 1
+            heapq.heappush(targets, (ratio + 1 / target.max_capacity, i, target))
+
+    def drain(self):
+        """Mailbox mode: terminate once empty, or re-offer users whose handoff failed."""
+        if self.pending_handoffs:
+            return
+        if self.connected_users:
+            self.hand_off_users()
+        else:
+            self.model.draining_servers.remove(self)
+            self.terminate()
 
+    def terminate(self):
+        """Shut down an empty server and drop it from the model."""
         # Mark server as inactive
         self.active = False
+        self.model.active_server_count -= 1
+        self.model.total_headroom -= self.upper_threshold - len(self.connected_users)
+        self.model.changed_servers.add(self)
         self.model.servers_died_this_step += 1
         # print(f"Server {self.unique_id} terminated due to underutilization")
         self.model.schedule.remove(self)
         self.model.server_agents.remove(self)
+        del self.model.servers_by_id[self.unique_id]
+        self.model.audit("terminate")
 
     def handle_user_dies(self, user):
         """Handle user death."""
-        self.current_load -= 1
-        self.connected_users.remove(user)
+        self.remove_connection(user)
+
+    def receive_requests(self, users):
+        """Mailbox mode: connect as many requesting users as fit; return the rest."""
+        if not self.active or self.draining:
+            free = 0
+        else:
+            free = max(0, self.max_capacity - self.current_load)
+        for user in users[:free]:
+            self.model.connect_requested(self, user)
+        self.model.total_rejected_requests += len(users[free:])
+        return users[free:]
 
     def receive_request(self, user):
         """Handle user request, either connect or balance load."""
@@ -253,43 +437,51 @@ class ServerAgent(Agent):
             self.connect_user(user)
         else:
             # Communicate with other servers to balance the load
+            self.model.total_rejected_requests += 1
             self.balance_load(user)
 
     def receive_message(self, user):
         """Receive a message from a user."""
-        print(f"Server {self.unique_id} received message from User {
-              user.unique_id}")
+        events = self.model.events
+        if events.enabled(GREETING):
+            events.emit(GREETING, user=user.unique_id, server=self.unique_id)
 
     def connect_user(self, user):
         """Connect a user to this server."""
-        print(f"test user: {user.unique_id}")
-        print(f"test server: {self.unique_id}")
+        events = self.model.events
+        if events.enabled(CONNECT):
+            events.emit(CONNECT, user=user.unique_id, server=self.unique_id)
         user.receive_server_response(self.unique_id)
-        self.current_load += 1
-        self.connected_users.append(user)
+        self.add_connection(user)
+        self.model.audit("connect_user")
 
     def balance_load(self, user):
         """Negotiate with other servers to balance the load."""
-        other_servers = [
-            s for s in self.model.server_agents if s != self and s.active]
-        for server in other_servers:
-            if server.current_load < server.max_capacity:
-                server.connect_user(user)
-                return
+        profiler = self.model.profiler
+        if profiler is not None:
+            profiler.balance_scans += 1
+        # The least loaded other server takes the user if it has room
+        server = self.model.load_index.least_loaded(exclude=self)
+        if server is not None and server.current_load < server.max_capacity:
+            server.connect_user(user)
+            return
         # If no servers can take the load, spawn a new server
-        self.model.spawn_server()
+        new_server = self.model.spawn_server()
         # New server handles the user
-        self.model.server_agents[-1].connect_user(user)
+        new_server.connect_user(user)
 
     def step(self):
         """Execute one step."""
-        if self.active:
+        # In mailbox mode, wait for the replies to earlier COLLAB requests first
+        if self.active and not self.draining and not self.awaiting_collab():
             # Check severe underutilization
             if self.check_severe_underutilization():
                 # First try to get users from other servers
                 is_underutilized, users_needed = self.check_utilization()
                 if is_underutilized:
                     self.request_users_from_others(users_needed)
+                    if self.awaiting_collab():
+                        return  # Decide on terminating once the replies are in
 
                 # If still severely underutilized and others can handle load
                 if self.check_severe_underutilization() and self.can_others_handle_load():
@@ -305,12 +497,211 @@ class ServerAgent(Agent):
         #     self.model.handle_server_failure(self)
 
 
+class LoadBalancerScheduler(BaseScheduler):
+    """Custom scheduler that activates agents in a specific order:
+    1. Users first (to request connections/die)
+    2. Servers second (to handle load balancing)
+    Users parked in the model's retry wheel are skipped until they wake.
+    """
+    def __init__(self, model):
+        super().__init__(model)
+        self.now = -1  # Step being executed, or the last one finished
+
+    def step_users(self):
+        """Execute the step of every user that is not backing off."""
+        self.now = self.steps
+        self.model.wake_users(self.now)
+        for agent in self.agents:
+            if isinstance(agent, UserAgent) and agent.retry_at is None:
+                agent.step()
+        self.model.deliver_messages()
+
+    def step_servers(self):
+        """Execute the step of every server."""
+        self.model.run_server_phase(
+            [agent for agent in self.agents if isinstance(agent, ServerAgent)])
+        self.model.deliver_messages()
+
+    def sync(self, user):
+        """Bring a user's counters up to date before outside code changes it."""
+
+    def reschedule(self, user):
+        """Note that outside code changed a user's state."""
+
+    def settle(self):
+        """Bring every user's counters up to date, e.g. before a checkpoint."""
+
+    def export_queue(self):
+        """Return scheduling state beyond the agent order, for checkpoints."""
+        return None
+
+    def import_queue(self, state):
+        """Restore export_queue's state once every agent has been re-added."""
+        self.now = self.steps - 1
+
+    def step(self):
+        """Execute the step of all agents, one at a time, in order."""
+        with self.model.phase("user_phase"):
+            self.step_users()
+        with self.model.phase("server_phase"):
+            self.step_servers()
+        self.steps += 1
+        self.time += 1
+
+
+class EventScheduler(LoadBalancerScheduler):
+    """Scheduler that activates only agents with a due event.
+
+    Between events a connected user's step only increments steps_alive.
+    So each user is queued for the step where something happens: a
+    connection request or its death. Users backing off sit in the
+    model's retry wheel and are queued again when they wake. Skipped steps are applied in one go when the user
+    is next activated or touched from outside (see sync). A server's
+    step is a no-op unless it is severely underutilized, so only those
+    servers are activated. Activation follows insertion order, as in
+    LoadBalancerScheduler, which keeps runs identical to fixed stepping.
+
+    Per-step cost scales with the number of due users plus the number
+    of underutilized servers and of servers whose load changed.
+    """
+
+    def __init__(self, model):
+        super().__init__(model)
+        self._queue = []  # (step, insertion order, user)
+        self._due = {}  # User id -> step of its live queue entry
+        self._synced = {}  # User id -> last step applied to its counters
+        self._order = {}  # Agent id -> insertion order
+        self._counter = itertools.count()
+        self.underutilized = set()  # Active servers below 30% load
+
+    def add(self, agent):
+        super().add(agent)
+        self._order[agent.unique_id] = next(self._counter)
+        if isinstance(agent, UserAgent):
+            # Due in the step about to run, like a freshly added agent
+            self._synced[agent.unique_id] = self.steps - 1
+            self._push(agent, self.steps)
+
+    def remove(self, agent):
+        super().remove(agent)
+        self._order.pop(agent.unique_id, None)
+        self._due.pop(agent.unique_id, None)
+        self._synced.pop(agent.unique_id, None)
+        self.underutilized.discard(agent)
+
+    def _push(self, user, step):
+        self._due[user.unique_id] = step
+        heapq.heappush(self._queue, (step, self._order[user.unique_id], user))
+
+    def _catch_up(self, user, upto):
+        """Apply the no-op steps a user skipped, up to step upto."""
+        skipped = upto - self._synced[user.unique_id]
+        if skipped > 0:
+            if user.connected_to:
+                user.steps_alive += skipped
+            self._synced[user.unique_id] = upto
+
+    def _schedule_next(self, user, step):
+        """Queue the next step at which the user does more than count."""
+        self._due.pop(user.unique_id, None)
+        if user.connected_to:
+            self._push(user, step + max(1, user.steps_to_live - user.steps_alive))
+        elif user.retry_at is None and not user.connection_requested:
+            self._push(user, step + 1)
+
+    def sync(self, user):
+        if user.unique_id in self._synced:
+            self._catch_up(user, self.now)
+
+    def reschedule(self, user):
+        if user.unique_id in self._synced:
+            self._schedule_next(user, self.now)
+
+    def settle(self):
+        for user in self.model.user_agents:
+            self.sync(user)
+
+    def export_queue(self):
+        return dict(self._due)
+
+    def import_queue(self, due):
+        """Rebuild the queue from export_queue's {user id: due step}.
+
+        With no saved queue (a checkpoint from fixed stepping) every user
+        that is not parked is due on the next step.
+        """
+        super().import_queue(due)
+        users = [agent for agent in self.agents if isinstance(agent, UserAgent)]
+        if due is None:
+            due = {user.unique_id: self.steps for user in users if user.retry_at is None}
+        self._queue = []
+        self._due = {}
+        for user in users:
+            self._synced[user.unique_id] = self.now
+        for user_id, step in due.items():
+            self._push(self._agents[user_id], step)
+        self.underutilized = {server for server in self.model.server_agents
+                              if server.active and server.check_severe_underutilization()}
+
+    def step_users(self):
+        """Execute the step of every user with an event due now."""
+        step = self.now = self.steps
+        for user in self.model.wake_users(step):
+            self._synced[user.unique_id] = step - 1  # Nothing counts while parked
+            self._push(user, step)
+        queue = self._queue
+        while queue and queue[0][0] <= step:
+            due, _, user = heapq.heappop(queue)
+            if self._due.get(user.unique_id) != due or user.unique_id not in self._agents:
+                continue  # Stale entry, or the user already died
+            self._catch_up(user, step - 1)
+            user.step()
+            if user.unique_id in self._synced:
+                self._synced[user.unique_id] = step
+                self._schedule_next(user, step)
+        self.model.deliver_messages()
+
+    def _refresh_underutilized(self):
+        for server in self.model.changed_servers:
+            if server.active and server.check_severe_underutilization():
+                self.underutilized.add(server)
+            else:
+                self.underutilized.discard(server)
+
+    def step_servers(self):
+        """Execute the step of every server that may act."""
+        # changed_servers holds every load change since the last metrics collect
+        self._refresh_underutilized()
+        self.model.run_server_phase(
+            sorted(self.underutilized, key=lambda s: self._order[s.unique_id]))
+        self.model.deliver_messages()
+        self._refresh_underutilized()
+
+
+SCHEDULERS = {"fixed": LoadBalancerScheduler, "event": EventScheduler}
+
+NO_PROFILER = nullcontext()  # Shared no-op phase when a model has no profiler
+
+PROPOSAL_CHUNK = 64  # Servers proposed per pool task in two-phase mode
+
+# Checkpointed attributes, in the order they are stored
+USER_FIELDS = ("connected_to", "steps_to_live", "steps_alive", "connection_requested",
+               "connection_approved", "wait_steps", "state", "retry_attempts", "retry_at")
+MODEL_PARAMS = ("initial_users", "server_failure_chance", "server_up_chance",
+                "max_server_capacity", "min_users", "max_users", "user_spawn_chance",
+                "verbose", "messaging", "latency", "server_phase", "rebalance")
+MODEL_COUNTERS = ("next_user_id", "next_server_id", "step_count",
+                  "users_spawned_this_step", "users_died_this_step",
+                  "servers_spawned_this_step", "servers_died_this_step",
+                  "total_users_spawned", "total_users_died", "total_servers_spawned",
+                  "total_servers_died", "total_rejected_requests", "total_transfers")
+
+
 class LoadBalancerModel(Model):
     """Model for load balancing with user and server agents."""
 
     def __init__(
         self,
-        visualizer,
         initial_users=20,
         initial_servers=4,
         max_server_capacity=10,
@@ -318,35 +709,91 @@ class LoadBalancerModel(Model):
         server_up_chance=0.1,
         max_users=100,
         min_users=10,
-        user_spawn_chance=0.5
+        user_spawn_chance=0.5,
+        verbose=True,
+        metrics=None,
+        scheduler="fixed",
+        backoff=None,
+        seed=None,
+        messaging="direct",
+        latency=0,
+        server_phase="serial",
+        proposal_pool=None,
+        placement="random",
+        rebalance="greedy",
+        profiler=None,
+        checker=None
     ):
         self.initial_users = initial_users
         self.server_failure_chance = server_failure_chance
         self.server_up_chance = server_up_chance
         self.max_server_capacity = max_server_capacity
-        self.visualizer = visualizer
-
-        class LoadBalancerScheduler(BaseScheduler):
-            """Custom scheduler that activates agents in a specific order:
-            1. Users first (to request connections/die)
-            2. Servers second (to handle load balancing)
-            """
-            def step(self):
-                """Execute the step of all agents, one at a time, in order."""
-                for agent in self.agents:
-                    if isinstance(agent, UserAgent):
-                        agent.step()
-                for agent in self.agents:
-                    if isinstance(agent, ServerAgent):
-                        agent.step()
-                self.steps += 1
-                self.time += 1
+        self.verbose = verbose  # Print debug events to stdout
+        # Every draw goes through this model's own RNG (self.random, from
+        # mesa's Model), so a seed reproduces a run and models never share a stream
+        self.random.seed(seed)
+
+        # Structured event log; sinks only see the kinds they subscribed to
+        self.events = EventBus()
+        if verbose:
+            self.events.subscribe(ConsoleSink(), level=DEBUG)
+
+        # Disconnected users wait in the retry wheel for their backoff
+        self.backoff = backoff if backoff is not None else FixedBackoff(10)
+        self.retry_wheel = TimerWheel()
+
+        # "direct": agents call each other. "mailbox": COMM/COLLAB/TRANSFER/NEGO
+        # go through the post office and are handled in batches at phase boundaries
+        if messaging not in ("direct", "mailbox"):
+            raise ValueError(f"Unknown messaging {messaging!r}, expected 'direct' or 'mailbox'")
+        self.messaging = messaging
+        self.latency = latency
+        self.post_office = PostOffice(latency) if messaging == "mailbox" else None
+        self.draining_servers = []  # Servers handing off users before terminating
+
+        # "serial": servers step one after another. "two_phase": each server
+        # proposes against a read-only view (on proposal_pool, an Executor,
+        # if given) and the proposals are committed in order
+        if server_phase not in ("serial", "two_phase"):
+            raise ValueError(f"Unknown server_phase {server_phase!r}, "
+                             "expected 'serial' or 'two_phase'")
+        self.server_phase = server_phase
+        self.proposal_pool = proposal_pool
+
+        # "greedy": each underutilized server pulls users itself. "bulk": one
+        # pass per step matches every deficit to the surplus (see rebalance_bulk)
+        if rebalance not in ("greedy", "bulk"):
+            raise ValueError(f"Unknown rebalance {rebalance!r}, expected 'greedy' or 'bulk'")
+        if rebalance == "bulk" and server_phase != "serial":
+            raise ValueError("rebalance='bulk' plans every move itself; use server_phase='serial'")
+        self.rebalance = rebalance
+
+        # Phase timings and hot-path counters (see profiling.py), if given
+        self.profiler = profiler
+
+        # O(1) invariant checks (see consistency.py), once per step or after
+        # every counting operation, if given
+        self.checker = checker
+        self.operation_checker = checker if checker is not None and checker.every_operation else None
+
+        # Picks the server each connection request goes to (see placement.py)
+        self.placement = make_placement(placement)
 
         # Replace the random activation with custom scheduler
-        self.schedule = LoadBalancerScheduler(self)
+        self.schedule = SCHEDULERS[scheduler](self)
         # self.grid = MultiGrid(20, 20, torus=True)
         self.server_agents = []
-        self.user_agents = []
+        self.servers_by_id = {}  # Server ID -> active ServerAgent
+        self.load_index = LoadIndex()  # Active servers by load ratio
+
+        # Running cluster-wide aggregates over active servers
+        self.active_server_count = 0
+        self.total_connected_users = 0  # Kept by the servers
+        self.users_connected = 0  # Users holding a connection, kept by the users
+        self.total_headroom = 0  # Sum of upper_threshold - connected users
+        self.changed_servers = set()  # Servers whose load changed this step
+        self.user_agents = IndexedSet()
+        self.dead_users = []  # Users that died since the last cleanup
         self.min_users = min_users
         self.max_users = max_users
         self.user_spawn_chance = user_spawn_chance
@@ -360,6 +807,14 @@ class LoadBalancerModel(Model):
         self.servers_spawned_this_step = 0
         self.servers_died_this_step = 0
 
+        # Cumulative counters (never reset)
+        self.total_users_spawned = 0
+        self.total_users_died = 0
+        self.total_servers_spawned = 0
+        self.total_servers_died = 0
+        self.total_rejected_requests = 0  # Requests the first server could not take
+        self.total_transfers = 0  # Users moved between servers
+
         # # Create a DataCollector to track server loads
         # self.datacollector = DataCollector(
         #     {
@@ -367,17 +822,8 @@ class LoadBalancerModel(Model):
         #     }
         # )
 
-        self.summarycollector = DataCollector(
-            model_reporters={
-                "Step": lambda m: m.step_count,
-                "Total Users": lambda m: len(m.user_agents),
-                "Server Allocations": lambda m: m.get_server_allocations(),
-                "New Users": lambda m: m.users_spawned_this_step,
-                "Dead Users": lambda m: m.users_died_this_step,
-                "New Servers": lambda m: m.servers_spawned_this_step,
-                "Dead Servers": lambda m: m.servers_died_this_step
-            }
-        )
+        # Columnar per-step metrics with bounded retention
+        self.metrics = metrics if metrics is not None else MetricsCollector()
 
         # Create initial servers
         for _ in range(initial_servers):
@@ -392,22 +838,219 @@ class LoadBalancerModel(Model):
         return {f"Server {s.unique_id}": len(s.connected_users)
                 for s in self.server_agents if s.active}
 
+    def skip_taken_id(self, candidate):
+        """Return the first id >= candidate not used by a scheduled agent.
+
+        User and server ids come from separate counters but share the
+        scheduler, so the two sequences eventually overlap.
+        """
+        while candidate in self.schedule._agents:
+            candidate += 1
+        return candidate
+
+    def pop_load_changes(self):
+        """Return (server id, load) for servers changed since the last call.
+
+        Terminated servers report TERMINATED as their load.
+        """
+        changes = [(s.unique_id, len(s.connected_users) if s.active else TERMINATED)
+                   for s in self.changed_servers]
+        self.changed_servers.clear()
+        return changes
+
+    def park_user(self, user):
+        """Park a disconnected user until its backoff of wait_steps ends."""
+        deadline = self.schedule.now + user.wait_steps + 1
+        user.retry_at = self.retry_wheel.schedule(user, deadline)
+
+    def wake_users(self, step):
+        """Wake the users whose backoff ends at step and return them."""
+        woken = []
+        for deadline, user in self.retry_wheel.advance(step):
+            if user.alive and user.retry_at == deadline:
+                user.wake()
+                woken.append(user)
+        return woken
+
+    def post(self, kind, sender, recipient, payload):
+        """Mailbox mode: send a message, delivered at a later phase boundary."""
+        self.post_office.send(kind, sender, recipient, payload, self.schedule.now)
+
+    def deliver_messages(self):
+        """Phase boundary: hand every due message to its recipient in batches.
+
+        Each server takes all of its connection requests at once; the
+        users no server could take are then placed in a single pass.
+        Messages sent while handling (with no latency) arrive in the same
+        boundary.
+        """
+        if self.post_office is None:
+            return
+        agents = self.schedule._agents
+        overflow = []
+        while True:
+            mailboxes = self.post_office.deliver(self.schedule.now)
+            if not mailboxes:
+                break
+            for recipient_id, messages in mailboxes.items():
+                server = self.servers_by_id.get(recipient_id)
+                requests = []
+                for message in messages:
+                    if message.kind == COLLAB:
+                        if server is not None:
+                            server.receive_collab(message.sender, message.payload)
+                        continue
+                    user = agents.get(message.payload)
+                    if message.kind == COMM:
+                        if user is not None and user.connected_to is None:
+                            requests.append(user)
+                        continue
+                    # TRANSFER or NEGO: a user handed over by the sender
+                    sender = self.servers_by_id.get(message.sender)
+                    if server is not None and user is not None:
+                        server.receive_transfer(user, sender)
+                    if message.kind == NEGO and sender is not None:
+                        sender.pending_handoffs -= 1
+                if requests and server is not None:
+                    overflow.extend(server.receive_requests(requests))
+                elif requests:
+                    self.total_rejected_requests += len(requests)
+                    overflow.extend(requests)
+        self.place_users(overflow)
+        for server in list(self.draining_servers):
+            server.drain()
+
+    def run_server_phase(self, servers):
+        """Step servers in order, or propose (in parallel) and commit in order."""
+        if self.rebalance == "bulk":
+            self.rebalance_bulk(servers)
+            return
+        if self.server_phase == "serial":
+            for server in servers:
+                server.step()
+            return
+        candidates = [s for s in servers
+                      if s.active and not s.draining and not s.awaiting_collab()
+                      and s.check_severe_underutilization()]
+        if not candidates:
+            return
+        view = take_view(self)
+        # Seeds are drawn in activation order, so results do not depend on the pool
+        tasks = [(s.unique_id, self.random.getrandbits(64)) for s in candidates]
+        if self.proposal_pool is None:
+            proposals = propose_many(view, tasks)
+        else:
+            chunks = [tasks[i:i + PROPOSAL_CHUNK] for i in range(0, len(tasks), PROPOSAL_CHUNK)]
+            proposals = [proposal for batch in
+                         self.proposal_pool.map(propose_many, [view] * len(chunks), chunks)
+                         for proposal in batch]
+        commit(self, proposals)
+
+    def rebalance_bulk(self, servers):
+        """Fill every severely underutilized server in one planned pass.
+
+        Servers still severely underutilized afterwards shut down as in
+        ServerAgent.step. Work is O(servers + moved users).
+        """
+        receivers = [s for s in servers
+                     if s.active and not s.draining and s.check_severe_underutilization()]
+        if not receivers:
+            return
+        moves = self.plan_moves(receivers)
+        self.apply_moves(moves)
+        if self.post_office is not None:
+            # Their users are still in flight; don't shut down servers expecting them
+            expecting = {receiver for _, receiver, _ in moves}
+            receivers = [s for s in receivers if s not in expecting]
+        for server in receivers:
+            if (server.active and not server.draining and server.check_severe_underutilization()
+                    and server.can_others_handle_load()):
+                server.distribute_users_and_terminate()
+
+    def plan_moves(self, receivers):
+        """Match receivers' deficits to other servers' surplus, in activation order.
+
+        Each server gives or takes down to or up to its upper_threshold.
+        Every user moves at most once, and a donor and receiver pair
+        share one (donor, receiver, count) move.
+        """
+        wanted = set(receivers)
+        donors = [(s, len(s.connected_users) - s.upper_threshold) for s in self.server_agents
+                  if s not in wanted and not s.draining
+                  and len(s.connected_users) > s.upper_threshold]
+        moves = []
+        donor_index = 0
+        for receiver in receivers:
+            deficit = receiver.upper_threshold - len(receiver.connected_users)
+            while deficit > 0 and donor_index < len(donors):
+                donor, surplus = donors[donor_index]
+                count = min(deficit, surplus)
+                moves.append((donor, receiver, count))
+                deficit -= count
+                if count == surplus:
+                    donor_index += 1
+                else:
+                    donors[donor_index] = (donor, surplus - count)
+        return moves
+
+    def apply_moves(self, moves):
+        """Move users along planned (donor, receiver, count) moves, in one batch.
+
+        In mailbox mode the users are sent as TRANSFER messages instead.
+        They stay with the donor until delivery, so each further move from
+        the same donor takes the users just before the ones already sent.
+        """
+        moved = 0
+        sent = {}  # Mailbox mode: donor -> users already sent
+        for donor, receiver, count in moves:
+            end = len(donor.connected_users) - sent.get(donor, 0)
+            users = donor.connected_users[end - count:end]
+            if self.post_office is not None:
+                sent[donor] = sent.get(donor, 0) + count
+                for user in users:
+                    self.post(TRANSFER, donor.unique_id, receiver.unique_id, user.unique_id)
+                continue
+            receiver.take_users(users, donor)
+            moved += count
+        self.total_transfers += moved
+        if moved and self.events.enabled(TRANSFER):
+            self.events.emit(TRANSFER, count=moved)
+
+    def connect_requested(self, server, user):
+        """Mailbox mode: connect a user whose request was handled at a boundary."""
+        self.schedule.sync(user)
+        server.connect_user(user)
+        self.schedule.reschedule(user)
+
+    def place_users(self, users):
+        """Mailbox mode: place users no server could take, in one pass."""
+        if self.profiler is not None:
+            self.profiler.balance_scans += len(users)
+        for user in users:
+            server = self.load_index.least_loaded()
+            if server is None or server.current_load >= server.max_capacity:
+                server = self.spawn_server()
+            self.connect_requested(server, user)
+
+    def get_user_count(self):
+        """Get the number of live users."""
+        return len(self.user_agents)
+
     def spawn_user(self):
         """Create a new user agent."""
+        self.next_user_id = self.skip_taken_id(self.next_user_id)
         user = UserAgent(self.next_user_id, self)
         # print(f"Spawning user with {self.next_user_id}")
         self.schedule.add(user)
-        self.user_agents.append(user)
+        self.user_agents.add(user)
         self.users_spawned_this_step += 1  # Increment counter
         self.next_user_id += 1
+        self.audit("spawn_user")
         return user
 
     def maintain_population(self):
         """Check and maintain user population within bounds."""
-        # Clean up dead users from list
-        self.user_agents = [user for user in self.user_agents
-                            if user in self.schedule.agents]
-
+        # Dead users are dropped by clean_user_agents before this runs
         current_users = len(self.user_agents)
 
         # Spawn new users if below minimum
@@ -417,25 +1060,39 @@ class LoadBalancerModel(Model):
                 self.spawn_user()
 
         # Random chance to spawn new user if below max
-        elif current_users < self.max_users and random.random() < self.user_spawn_chance:
+        elif current_users < self.max_users and self.random.random() < self.user_spawn_chance:
             self.spawn_user()
 
         # Kill random user if above max
         elif current_users > self.max_users:
-            user_to_kill = random.choice(self.user_agents)
+            user_to_kill = self.user_agents.choice(self.random)
             user_to_kill.die()
 
     def spawn_server(self):
         """Spawn a new server."""
         # id = len(self.server_agents)
-        print(f"Spawning server with {self.next_server_id}")
+        self.next_server_id = self.skip_taken_id(self.next_server_id)
+        if self.events.enabled(SPAWN):
+            self.events.emit(SPAWN, server=self.next_server_id)
         server = ServerAgent(self.next_server_id, self, max_capacity=self.max_server_capacity)
         self.schedule.add(server)   # add to scheduler (aka simulation)
         self.server_agents.append(server)
+        self.servers_by_id[server.unique_id] = server
+        self.changed_servers.add(server)
+        self.load_index.add(server)
+        self.placement.add(server)
+        self.active_server_count += 1
+        self.total_headroom += server.upper_threshold
         self.servers_spawned_this_step += 1  # Increment counter
         self.next_server_id += 1
+        self.audit("spawn_server")
         return server
 
+    def audit(self, operation):
+        """Check the invariants after operation, if checking every operation."""
+        if self.operation_checker is not None:
+            self.operation_checker.check(self, operation)
+
     def handle_server_failure(self, failed_server):
         """Redistribute users from a failed server."""
         users_to_reassign = [
@@ -445,42 +1102,171 @@ class LoadBalancerModel(Model):
 
     def clean_user_agents(self):
         """Remove dead users from tracking list."""
-        self.user_agents = [user for user in self.user_agents 
-                           if user in self.schedule.agents]
-        
+        for user in self.dead_users:
+            self.user_agents.discard(user)
+        self.dead_users.clear()
+
+    def get_state(self):
+        """Return the full simulation state as plain data, between steps.
+
+        Agents are stored as tuples in activation order together with
+        every order that affects a random choice or a tie, so a model
+        rebuilt by from_state continues exactly like this one. Derived
+        structures (load index, aggregates, queues) are rebuilt, not stored.
+        """
+        self.clean_user_agents()
+        self.schedule.settle()
+        user_fields = operator.attrgetter(*USER_FIELDS)
+        agents = []
+        for agent in self.schedule.agents:
+            if isinstance(agent, UserAgent):
+                agents.append((agent.unique_id, None) + user_fields(agent))
+            else:
+                agents.append((agent.unique_id, (agent.max_capacity, agent.current_load,
+                                                 agent.active,
+                                                 tuple(u.unique_id for u in agent.connected_users),
+                                                 agent.draining, agent.pending_handoffs,
+                                                 agent.collab_replies_due)))
+        scheduler = next(name for name, cls in SCHEDULERS.items()
+                         if type(self.schedule) is cls)
+        return {
+            "params": {name: getattr(self, name) for name in MODEL_PARAMS},
+            "scheduler": scheduler,
+            "backoff": self.backoff,
+            "placement": copy.deepcopy(self.placement),
+            "counters": tuple(getattr(self, name) for name in MODEL_COUNTERS),
+            "clock": (self.schedule.steps, self.schedule.time, self.retry_wheel.tick),
+            "agents": agents,
+            "users": tuple(user.unique_id for user in self.user_agents),
+            "load_order": tuple(s.unique_id for s in self.load_index.in_update_order()),
+            "queue": self.schedule.export_queue(),
+            "mail": self.post_office.export() if self.post_office is not None else (),
+            "draining": tuple(s.unique_id for s in self.draining_servers),
+            "rng": self.random.getstate(),
+        }
+
+    @classmethod
+    def from_state(cls, state, **params):
+        """Build a model from get_state's data.
+
+        Keyword arguments are passed to the constructor and override the
+        stored parameters (metrics, verbose, scheduler, ...).
+        """
+        params = {"scheduler": state["scheduler"], "backoff": state["backoff"],
+                  "placement": copy.deepcopy(state.get("placement", "random")),
+                  **state["params"], **params}
+        params["initial_users"] = params["initial_servers"] = 0
+        model = cls(**params)
+        model.initial_users = state["params"]["initial_users"]
+        schedule = model.schedule
+        schedule.steps, schedule.time, model.retry_wheel.tick = state["clock"]
+
+        users = {}
+        for record in state["agents"]:
+            agent_id, server = record[:2]
+            if server is None:
+                agent = UserAgent(agent_id, model)
+                for name, value in zip(USER_FIELDS, record[2:]):
+                    setattr(agent, name, value)
+                users[agent_id] = agent
+            else:
+                agent = ServerAgent(agent_id, model, max_capacity=server[0])
+                agent.active = server[2]  # server[1], the load, follows from its users
+                agent.draining, agent.pending_handoffs = server[4], server[5]
+                agent.collab_replies_due = server[6] if len(server) > 6 else None
+                if agent.active:
+                    model.server_agents.append(agent)
+                    model.servers_by_id[agent_id] = agent
+            schedule.add(agent)
+
+        for record in state["agents"]:
+            server = record[1]
+            if server is None or not server[2]:
+                continue
+            agent = model.servers_by_id[record[0]]
+            for user_id in server[3]:
+                agent.connected_users.add(users[user_id])
+            model.active_server_count += 1
+            model.total_connected_users += len(agent.connected_users)
+            model.total_headroom += agent.upper_threshold - len(agent.connected_users)
+        for user_id in state["users"]:
+            model.user_agents.add(users[user_id])
+        model.users_connected = sum(1 for user in users.values() if user.connected_to is not None)
+        for server_id in state["load_order"]:
+            model.load_index.add(model.servers_by_id[server_id])
+        model.placement.attach(model.server_agents)
+        for user in users.values():
+            if user.retry_at is not None:
+                model.retry_wheel.schedule(user, user.retry_at)
+        schedule.import_queue(state["queue"])
+        if model.post_office is not None:
+            model.post_office.restore(state["mail"])
+        model.draining_servers = [model.servers_by_id[i] for i in state["draining"]]
+
+        for name, value in zip(MODEL_COUNTERS, state["counters"]):
+            setattr(model, name, value)
+        model.events.step = model.step_count
+        model.changed_servers = set(model.server_agents)  # Metrics learn every load
+        model.random.setstate(state["rng"])
+        return model
+
+    def phase(self, name):
+        """Context manager timing a step phase on the profiler, if there is one."""
+        if self.profiler is None:
+            return NO_PROFILER
+        return self.profiler.phase(name)
+
     def step(self):
         """Execute one model step."""
-        # Clean dead users first
-        self.clean_user_agents()    # get the user agents in simulation
-        self.maintain_population()  # spawn new users if below min
+        if self.profiler is not None:
+            self.profiler.begin_step(self)
+        with self.phase("maintain_population"):
+            # Clean dead users first
+            self.clean_user_agents()    # get the user agents in simulation
+            self.maintain_population()  # spawn new users if below min
         self.schedule.step()    # execute step for all agents
-        # Clean again after step
-        self.clean_user_agents()
+        with self.phase("collect"):
+            # Clean again after step
+            self.clean_user_agents()
 
-        # BUG: This is not working as expected, produces wrong counts sometimes
-        # Verify consistency
-        # assert len(self.user_agents) == sum(len(s.connected_users) 
-        #        for s in self.server_agents if s.active), "User count mismatch!"
-        
+            # Verify consistency: counts are kept incrementally, so this is O(1)
+            if self.checker is not None:
+                self.checker.check(self, "step")
+
+            self.end_step()
+        if self.profiler is not None:
+            self.profiler.end_step(self)
+
+    def end_step(self):
+        """Collect step data, roll the counters over and emit a summary."""
         # self.datacollector.collect(self)
-        self.summarycollector.collect(self)
+        self.metrics.collect(self)
 
-        # Reset counters
+        # Accumulate, then reset counters
+        self.total_users_spawned += self.users_spawned_this_step
+        self.total_users_died += self.users_died_this_step
+        self.total_servers_spawned += self.servers_spawned_this_step
+        self.total_servers_died += self.servers_died_this_step
         self.step_count += 1
         self.users_spawned_this_step = 0
         self.users_died_this_step = 0
         self.servers_spawned_this_step = 0
         self.servers_died_this_step = 0
 
-        # Print step summary
-        data = self.summarycollector.model_vars
-        print(f"\nStep {self.step_count}:")
-        print(f"Total Users: {data['Total Users'][-1]}")
-        print(f"Server Allocations: {data['Server Allocations'][-1]}")
-        print(f"New Users: {data['New Users'][-1]}")
-        print(f"Dead Users: {data['Dead Users'][-1]}")
-        print(f"New Servers: {data['New Servers'][-1]}")
-        print(f"Dead Servers: {data['Dead Servers'][-1]}")
+        self.events.step = self.step_count
+
+        # Step summary
+        if self.events.enabled(STEP):
+            last = self.metrics.last
+            self.events.emit(STEP, data={
+                "Total Users": last["total_users"],
+                "Server Allocations": {f"Server {server_id}": load for server_id, load
+                                       in self.metrics.loads.items()},
+                "New Users": last["new_users"],
+                "Dead Users": last["dead_users"],
+                "New Servers": last["new_servers"],
+                "Dead Servers": last["dead_servers"],
+            })
 
 
 # def agent_portrayal(agent):
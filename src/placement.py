@@ -0,0 +1,183 @@
+import bisect
+import hashlib
+import math
+import statistics
+import time
+
+
+class PlacementPolicy:
+    """Picks the server a user asks for a connection.
+
+    The picked server still decides: if it is full it balances the load
+    as before, so a policy only changes where requests land first.
+    choose() times every decision with perf_counter_ns.
+    """
+
+    name = None
+
+    def __init__(self):
+        self.decisions = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def choose(self, model, user):
+        start = time.perf_counter_ns()
+        server = self.pick(model, user)
+        elapsed = time.perf_counter_ns() - start
+        self.decisions += 1
+        self.total_ns += elapsed
+        if elapsed > self.max_ns:
+            self.max_ns = elapsed
+        return server
+
+    def pick(self, model, user):
+        raise NotImplementedError
+
+    def add(self, server):
+        """A server became available for placement."""
+
+    def remove(self, server):
+        """A server stopped taking new users (draining or terminated)."""
+
+    def attach(self, servers):
+        """Rebuild derived state for a restored model's servers."""
+        for server in servers:
+            self.add(server)
+
+    def stats(self):
+        return {
+            "decisions": self.decisions,
+            "mean_ns": self.total_ns / self.decisions if self.decisions else 0.0,
+            "max_ns": self.max_ns,
+        }
+
+
+class RandomPlacement(PlacementPolicy):
+    """Any server, uniformly at random (the original behaviour)."""
+
+    name = "random"
+
+    def pick(self, model, user):
+        return model.random.choice(model.server_agents)
+
+
+class RoundRobinPlacement(PlacementPolicy):
+    """Servers in turn, in activation order."""
+
+    name = "round_robin"
+
+    def __init__(self):
+        super().__init__()
+        self.cursor = 0
+
+    def pick(self, model, user):
+        servers = model.server_agents
+        self.cursor %= len(servers)
+        server = servers[self.cursor]
+        self.cursor += 1
+        return server
+
+
+class LeastConnectionsPlacement(PlacementPolicy):
+    """The server with the lowest load ratio, from the load index."""
+
+    name = "least_connections"
+
+    def pick(self, model, user):
+        return model.load_index.least_loaded() or model.random.choice(model.server_agents)
+
+
+class PowerOfTwoPlacement(PlacementPolicy):
+    """The less loaded of two servers drawn at random."""
+
+    name = "power_of_two"
+
+    def pick(self, model, user):
+        servers = model.server_agents
+        a = model.random.choice(servers)
+        b = model.random.choice(servers)
+        ratio = model.load_index.load_ratio
+        return b if ratio(b) < ratio(a) else a
+
+
+def ring_hash(key):
+    """Stable 64-bit hash, the same in every process."""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class BoundedConsistentHashPlacement(PlacementPolicy):
+    """Consistent hashing with bounded loads.
+
+    Each server owns `replicas` points on a hash ring. A user goes to the
+    first server clockwise from its own hash whose load is under
+    ceil(balance * mean load), and never at capacity. Users keep landing
+    on the same server while the cluster changes, and no server gets
+    more than its bounded share.
+    """
+
+    name = "consistent_hash"
+
+    def __init__(self, replicas=16, balance=1.25):
+        super().__init__()
+        self.replicas = replicas
+        self.balance = balance
+        self.ring = []  # Sorted (point, server id)
+        self.servers = {}  # Server id -> server on the ring
+
+    def add(self, server):
+        self.servers[server.unique_id] = server
+        for replica in range(self.replicas):
+            bisect.insort(self.ring, (ring_hash(f"{server.unique_id}:{replica}"), server.unique_id))
+
+    def remove(self, server):
+        if self.servers.pop(server.unique_id, None) is not None:
+            self.ring = [point for point in self.ring if point[1] != server.unique_id]
+
+    def attach(self, servers):
+        self.ring = []
+        self.servers = {}
+        super().attach(s for s in servers if not s.draining)
+
+    def __getstate__(self):
+        # The ring is rebuilt by attach(); copies must not drag servers along
+        return {**self.__dict__, "ring": [], "servers": {}}
+
+    def pick(self, model, user):
+        ring = self.ring
+        if not ring:
+            return model.random.choice(model.server_agents)
+        mean = (model.total_connected_users + 1) / len(self.servers)
+        start = bisect.bisect(ring, (ring_hash(str(user.unique_id)),))
+        for offset in range(len(ring)):
+            server = self.servers[ring[(start + offset) % len(ring)][1]]
+            bound = min(server.max_capacity, math.ceil(self.balance * mean))
+            if len(server.connected_users) < bound:
+                return server
+        return self.servers[ring[start % len(ring)][1]]  # Everyone is full
+
+
+PLACEMENTS = {policy.name: policy for policy in (
+    RandomPlacement, RoundRobinPlacement, LeastConnectionsPlacement,
+    PowerOfTwoPlacement, BoundedConsistentHashPlacement)}
+
+
+def make_placement(placement):
+    """Return a policy for a PLACEMENTS name, or placement itself if it is one."""
+    if isinstance(placement, PlacementPolicy):
+        return placement
+    if placement not in PLACEMENTS:
+        raise ValueError(f"Unknown placement {placement!r}, expected one of "
+                         f"{', '.join(PLACEMENTS)}")
+    return PLACEMENTS[placement]()
+
+
+def imbalance(model):
+    """Load spread over active servers: (max / mean, coefficient of variation).
+
+    Both are 1.0 and 0.0 for a perfectly even cluster.
+    """
+    loads = [len(s.connected_users) for s in model.server_agents]
+    mean = statistics.fmean(loads) if loads else 0.0
+    if not mean:
+        return 1.0, 0.0
+    return max(loads) / mean, statistics.pstdev(loads) / mean
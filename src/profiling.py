@@ -0,0 +1,106 @@
+import cProfile
+import io
+import pstats
+import time
+
+PHASES = ("maintain_population", "user_phase", "server_phase", "collect")
+
+
+class PhaseTimer:
+    """Context manager adding its block's wall time to one profiler phase."""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter_ns() - self.start)
+
+
+class Profiler:
+    """Per-phase wall time and hot-path counters for a LoadBalancerModel.
+
+    Pass one as the model's profiler. LoadBalancerModel.step and the
+    scheduler time their phases through it, and agents count server
+    lookups and balance_load scans. Transfers, spawns and terminations
+    come from the model's own counters. With samples=True every phase
+    duration is kept, not just the totals. cprofile_steps (a range of
+    step numbers) runs cProfile over those steps only.
+    """
+
+    def __init__(self, samples=False, cprofile_steps=None):
+        self.timers = {name: PhaseTimer(self, name) for name in PHASES}
+        self.cprofile_steps = cprofile_steps
+        self.cprofile = cProfile.Profile() if cprofile_steps is not None else None
+        self.keep_samples = samples
+        self.reset()
+
+    def reset(self):
+        """Zero every total and counter."""
+        self.steps = 0
+        self.phase_ns = dict.fromkeys(PHASES, 0)
+        self.samples = {name: [] for name in PHASES}
+        self.lookups = 0  # UserAgent.get_server calls
+        self.balance_scans = 0  # Overflow placements (balance_load, place_users)
+        self.baseline = None  # Model counters when counting started
+
+    def phase(self, name):
+        return self.timers[name]
+
+    def add(self, name, elapsed_ns):
+        self.phase_ns[name] += elapsed_ns
+        if self.keep_samples:
+            self.samples[name].append(elapsed_ns)
+
+    @staticmethod
+    def model_counters(model):
+        return (model.total_transfers,
+                model.total_servers_spawned + model.servers_spawned_this_step,
+                model.total_servers_died + model.servers_died_this_step)
+
+    def begin_step(self, model):
+        if self.baseline is None:
+            self.baseline = self.model_counters(model)
+        if self.cprofile is not None and model.step_count in self.cprofile_steps:
+            self.cprofile.enable()
+
+    def end_step(self, model):
+        self.steps += 1
+        if self.cprofile is not None:
+            self.cprofile.disable()
+
+    def counters(self, model):
+        """Hot-path counts since the first profiled step (or the last reset)."""
+        transfers, spawns, terminations = (
+            now - then for now, then in zip(self.model_counters(model),
+                                            self.baseline or self.model_counters(model)))
+        return {
+            "lookups": self.lookups,
+            "balance_scans": self.balance_scans,
+            "transfers": transfers,
+            "spawns": spawns,
+            "terminations": terminations,
+        }
+
+    def report(self, model):
+        """Return phase totals and means (microseconds) and the counters."""
+        steps = self.steps or 1
+        return {
+            "steps": self.steps,
+            "phases": {name: {"total_ms": self.phase_ns[name] / 1e6,
+                              "mean_us": self.phase_ns[name] / steps / 1e3}
+                       for name in PHASES},
+            "counters": self.counters(model),
+        }
+
+    def cprofile_stats(self, sort="cumulative", limit=25):
+        """Return the cProfile table for the profiled steps as text."""
+        if self.cprofile is None:
+            return ""
+        out = io.StringIO()
+        pstats.Stats(self.cprofile, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
@@ -1,7 +1,8 @@
 from model import LoadBalancerModel
+from snapshot import SimulationWorker
 from visualization import NetworkVisualizer
+import argparse
 import pygame
-import random
 
 class Button:
     def __init__(self, x, y, width, height, text, color):
@@ -12,11 +13,14 @@ class Button:
                              min(color[1] + 30, 255),
                              min(color[2] + 30, 255))
         self.is_hovered = False
+        self.text_surface = None
 
     def draw(self, screen, font):
         color = self.active_color if self.is_hovered else self.color
         pygame.draw.rect(screen, color, self.rect)
-        text_surface = font.render(self.text, True, (255, 255, 255))
+        if self.text_surface is None:  # The label never changes; render it once
+            self.text_surface = font.render(self.text, True, (255, 255, 255))
+        text_surface = self.text_surface
         text_rect = text_surface.get_rect(center=self.rect.center)
         screen.blit(text_surface, text_rect)
 
@@ -29,10 +33,15 @@ class Button:
         return False
 
 
-def run_simulation():
-    def create_new_model(visualizer):
+def run_simulation(sim_rate=2, fps=30, checkpoint_every=10):
+    """Step the model on a worker thread and draw its snapshots at fps.
+
+    sim_rate is the target steps per second; None runs as fast as possible.
+    Rewind goes back to checkpoints taken every checkpoint_every steps
+    (0 takes none, so Rewind does nothing).
+    """
+    def create_new_model():
         return LoadBalancerModel(
-            visualizer=visualizer,
             min_users=2,
             max_users=15,
             initial_users=12,
@@ -43,7 +52,11 @@ def run_simulation():
 
     # Create visualizer
     vis = NetworkVisualizer()
-    model = create_new_model(vis)
+    # Above the visualizer's detail threshold only a sample of users is drawn,
+    # so snapshots need not carry more than that
+    worker = SimulationWorker(create_new_model, target_rate=sim_rate, publish_rate=fps,
+                              max_links=vis.lod_threshold, checkpoint_every=checkpoint_every)
+    worker.start()
 
 
     button_height = 40
@@ -69,6 +82,9 @@ def run_simulation():
     "Butterfly", 
     (128, 0, 128)  # Purple
     )
+    # Go back to the previous checkpoint
+    rewind_button = Button(butterfly_button.rect.right + spacing, y_position,
+                           button_width, button_height, "Rewind", (0, 100, 150))
     # Add history button
     # history_button = Button(
     #     restart_button.rect.right + spacing, 
@@ -82,7 +98,6 @@ def run_simulation():
     print(f"Button positions: Start={start_button.rect}, Pause={
           pause_button.rect}, restart={restart_button.rect}")
 
-    paused = True
     running = True
     show_history = False
     clock = pygame.time.Clock()
@@ -95,21 +110,19 @@ def run_simulation():
 
             # Handle button clicks
             if start_button.handle_event(event):
-                paused = False
+                worker.send("start")
                 print("Start clicked")
             elif pause_button.handle_event(event):
-                paused = True
+                worker.send("pause")
                 print("Pause clicked")
-            elif step_button.handle_event(event) and paused:  # Only step when paused
-                model.step()  # Execute single step
+            elif step_button.handle_event(event):
+                worker.send("step")  # Execute single step
             elif restart_button.handle_event(event):
-                model = create_new_model(vis)  # Create fresh model
-                paused = True  # Pause on restart
+                worker.send("restart")  # Create fresh model
             elif butterfly_button.handle_event(event):
-                if model.server_agents:
-                    # Trigger effect on random server
-                    server = random.choice(model.server_agents)
-                    server.trigger_butterfly_effect()
+                worker.send("butterfly")
+            elif rewind_button.handle_event(event):
+                worker.send("rewind")
             # elif history_button.handle_event(event):
             #     print("History button clicked")  # Debug
             #     if vis.previous_frame:
@@ -122,12 +135,8 @@ def run_simulation():
             #     else:
             #         print("No previous frame")
 
-        # Execute model step if not paused
-        if not paused:
-            model.step()
-
-        # Update visualization
-        vis.draw(model)
+        # Draw whatever the worker published last
+        dirty = vis.draw(worker.latest)
 
         # Draw buttons with thick borders
         pygame.draw.rect(vis.screen, (50, 50, 50), start_button.rect, 3)  # Add border
@@ -135,6 +144,7 @@ def run_simulation():
         pygame.draw.rect(vis.screen, (50, 50, 50), pause_button.rect, 3)
         pygame.draw.rect(vis.screen, (50, 50, 50), restart_button.rect, 3)
         pygame.draw.rect(vis.screen, (50, 50, 50), butterfly_button.rect, 3)
+        pygame.draw.rect(vis.screen, (50, 50, 50), rewind_button.rect, 3)
         # pygame.draw.rect(vis.screen, (50, 50, 50), history_button.rect, 3)
         # Draw buttons
         start_button.draw(vis.screen, vis.font)
@@ -142,14 +152,35 @@ def run_simulation():
         pause_button.draw(vis.screen, vis.font)
         restart_button.draw(vis.screen, vis.font)
         butterfly_button.draw(vis.screen, vis.font)
+        rewind_button.draw(vis.screen, vis.font)
         # history_button.draw(vis.screen, vis.font)
-        
-        pygame.display.flip()
-        clock.tick(2)  # 2 FPS for clear visualization
 
+        # Push only the changed panels and the buttons to the display
+        dirty += [button.rect for button in (start_button, step_button, pause_button,
+                                             restart_button, butterfly_button,
+                                             rewind_button)]
+        pygame.display.update(dirty)
+        clock.tick(fps)
+
+    worker.send("stop")
+    worker.join()
     vis.history_window.close()
     vis.close()
 
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the load balancer visualization.")
+    parser.add_argument("--rate", type=float, default=2,
+                        help="target simulation steps per second (0 = uncapped)")
+    parser.add_argument("--fps", type=int, default=30, help="display frame rate")
+    parser.add_argument("--checkpoint-every", type=int, default=10,
+                        help="steps between Rewind checkpoints (0 = none)")
+    args = parser.parse_args(argv)
+    if args.checkpoint_every < 0:
+        parser.error("--checkpoint-every must be 0 or more")
+    run_simulation(sim_rate=args.rate or None, fps=args.fps,
+                   checkpoint_every=args.checkpoint_every)
+
+
 if __name__ == "__main__":
-    run_simulation()
+    main()
@@ -0,0 +1,140 @@
+from checkpoint import CheckpointRing
+from collections import namedtuple
+from events import RingBufferSink
+import queue
+import threading
+import time
+
+# servers: (server id, connected users, active) per server, in model order
+# links: connected server id (or None) per user, in model order; only an
+#   evenly spaced sample of users when the population is large
+# events: the most recent events, oldest first
+Snapshot = namedtuple("Snapshot",
+                      "step servers links events user_count active_servers capacity")
+
+
+def take_snapshot(model, recent_events=(), max_links=None):
+    """Copy what the renderer needs out of a live model.
+
+    With max_links set, at most about that many users are copied, so a
+    snapshot of a large population costs O(servers + max_links).
+    """
+    users = model.user_agents
+    if max_links and len(users) > max_links:
+        users = users[::-(-len(users) // max_links)]
+    return Snapshot(
+        step=model.step_count,
+        servers=tuple((s.unique_id, len(s.connected_users), s.active)
+                      for s in model.server_agents),
+        links=tuple(user.connected_to for user in users),
+        events=tuple(recent_events),
+        user_count=model.get_user_count(),
+        active_servers=model.active_server_count,
+        capacity=model.max_server_capacity,
+    )
+
+
+class SimulationWorker(threading.Thread):
+    """Runs a model on its own thread and publishes snapshots.
+
+    Only this thread touches the model. The UI sends commands with
+    send() and reads the most recent snapshot from `latest`.
+    target_rate caps steps per second (None runs uncapped).
+    publish_rate caps how often a snapshot is built, so a fast run does
+    not pay O(users) per step just to be drawn; max_links caps how many
+    users a snapshot carries. A checkpoint is kept every
+    checkpoint_every steps so the run can be rewound; 0 keeps none.
+    """
+
+    def __init__(self, model_factory, target_rate=None, publish_rate=30, log_size=16,
+                 max_links=None, checkpoint_every=10):
+        super().__init__(daemon=True)
+        self.model_factory = model_factory
+        self.target_rate = target_rate
+        self.publish_interval = 1 / publish_rate if publish_rate else 0
+        self.log_size = log_size
+        self.max_links = max_links
+        self.checkpoints = CheckpointRing(every=checkpoint_every)
+        self.commands = queue.Queue()
+        self.running = False
+        self._latest = None
+        self._lock = threading.Lock()
+        self._last_publish = 0.0
+        self._reset()
+
+    def _reset(self):
+        self.checkpoints.discard_from(0)
+        self._attach(self.model_factory())
+
+    def _attach(self, model):
+        self.model = model
+        self.log = RingBufferSink(self.log_size)
+        self.model.events.subscribe(self.log)
+        self.checkpoints.maybe_record(self.model)
+        self.publish()
+
+    def _step(self):
+        self.model.step()
+        self.checkpoints.maybe_record(self.model)
+
+    @property
+    def latest(self):
+        with self._lock:
+            return self._latest
+
+    def publish(self):
+        snapshot = take_snapshot(self.model, self.log.events, self.max_links)
+        with self._lock:
+            self._latest = snapshot
+        self._last_publish = time.perf_counter()
+
+    def send(self, command):
+        """Queue one of: start, pause, step, restart, rewind, butterfly, stop."""
+        self.commands.put(command)
+
+    def _handle(self, command):
+        if command == "start":
+            self.running = True
+        elif command == "pause":
+            self.running = False
+        elif command == "step" and not self.running:  # Only step when paused
+            self._step()
+        elif command == "restart":
+            self.running = False  # Pause on restart
+            self._reset()
+        elif command == "rewind":
+            self.running = False  # Pause on rewind
+            model = self.checkpoints.rewind(self.model.step_count, verbose=self.model.verbose)
+            if model is not None:
+                self._attach(model)
+        elif command == "butterfly" and self.model.server_agents:
+            # Trigger effect on random server
+            self.model.random.choice(self.model.server_agents).trigger_butterfly_effect()
+        elif command == "stop":
+            return False
+        self.publish()
+        return True
+
+    def run(self):
+        interval = 1 / self.target_rate if self.target_rate else 0
+        next_step = time.perf_counter()
+        while True:
+            # Block while paused; just drain commands while running
+            try:
+                command = self.commands.get(timeout=None if not self.running else 0)
+            except queue.Empty:
+                command = None
+            if command is not None:
+                if not self._handle(command):
+                    return
+                continue
+
+            self._step()
+            now = time.perf_counter()
+            if now - self._last_publish >= self.publish_interval:
+                self.publish()
+            if interval:
+                next_step = max(next_step + interval, now - interval)
+                delay = next_step - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
@@ -0,0 +1,97 @@
+from headless import ENGINES, run_headless
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import csv
+import itertools
+import os
+import sys
+
+
+def expand_grid(grid):
+    """Turn {param: [values]} into a list of parameter dicts."""
+    names = list(grid)
+    return [dict(zip(names, values))
+            for values in itertools.product(*(grid[name] for name in names))]
+
+
+def run_one(task):
+    """Run a single configuration and return its summary row."""
+    params, seed, steps, engine, resume = task
+    _, results = run_headless(steps=steps, seed=seed, engine=engine, resume=resume, **params)
+    row = dict(params)
+    row["seed"] = seed
+    row["server_churn"] = results["servers_spawned"] + results["servers_died"]
+    row.update(results)
+    return row
+
+
+def run_sweep(grid, seeds, steps=1000, engine="agents", processes=None, resume=None):
+    """Run every grid point for every seed across a process pool.
+
+    Rows come back in grid order, seeds varying fastest. With resume, every
+    run continues from that checkpoint file instead of warming up from step 0.
+    """
+    tasks = [(params, seed, steps, engine, resume)
+             for params in expand_grid(grid) for seed in seeds]
+    if processes == 1:
+        return [run_one(task) for task in tasks]
+    workers = processes or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(tasks) // (4 * workers))
+        return list(pool.map(run_one, tasks, chunksize=chunksize))
+
+
+def write_table(rows, file):
+    """Write sweep rows as CSV."""
+    if not rows:
+        return
+    writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def parse_values(text):
+    """Parse 'a,b,c' into ints or floats, keeping anything else as a string."""
+    values = []
+    for item in text.split(","):
+        try:
+            number = float(item)
+        except ValueError:
+            values.append(item)
+            continue
+        values.append(int(number) if number.is_integer() and "." not in item else number)
+    return values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Sweep LoadBalancerModel parameters across a process pool.")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2",
+                        help="model parameter and the values to try, e.g. max_users=50,100")
+    parser.add_argument("--seeds", type=int, default=5, help="number of seeds per configuration")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--engine", choices=ENGINES, default="agents")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--out", default=None, help="CSV file to write (default: stdout)")
+    parser.add_argument("--resume", default=None,
+                        help="start every run from this checkpoint (see headless.py --checkpoint-out)")
+    args = parser.parse_args(argv)
+
+    grid = {}
+    for spec in args.param:
+        name, _, values = spec.partition("=")
+        grid[name.replace("-", "_")] = parse_values(values)
+
+    rows = run_sweep(grid, range(args.seeds), steps=args.steps,
+                     engine=args.engine, processes=args.processes, resume=args.resume)
+    if args.out:
+        with open(args.out, "w", newline="") as file:
+            write_table(rows, file)
+        print(f"Wrote {len(rows)} runs to {args.out}")
+    else:
+        write_table(rows, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
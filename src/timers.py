@@ -0,0 +1,94 @@
+import random
+
+
+class TimerWheel:
+    """Hashed timer wheel keyed by simulation step.
+
+    An entry lives in slot deadline % slots. Advancing one step scans a
+    single slot, and entries more than one lap ahead stay put until
+    their lap comes round. Cancelling is left to the caller: a fired
+    entry whose owner no longer expects it is simply ignored.
+    """
+
+    def __init__(self, slots=64):
+        self._slots = [[] for _ in range(slots)]
+        self.tick = -1  # Last step advanced to
+        self.count = 0  # Pending entries, including cancelled ones
+
+    def schedule(self, item, deadline):
+        """Fire item when the wheel reaches deadline; return the deadline."""
+        deadline = max(deadline, self.tick + 1)
+        self._slots[deadline % len(self._slots)].append((deadline, item))
+        self.count += 1
+        return deadline
+
+    def advance(self, tick):
+        """Move to tick and return (deadline, item) for every expired entry."""
+        expired = []
+        size = len(self._slots)
+        if tick - self.tick >= size:
+            visit = range(size)
+        else:
+            visit = (t % size for t in range(self.tick + 1, tick + 1))
+        for index in visit:
+            slot = self._slots[index]
+            if not slot:
+                continue
+            keep = []
+            for entry in slot:
+                (expired if entry[0] <= tick else keep).append(entry)
+            self._slots[index] = keep
+        self.tick = tick
+        self.count -= len(expired)
+        return expired
+
+    def entries(self):
+        """Return every pending (deadline, item)."""
+        return [entry for slot in self._slots for entry in slot]
+
+    def __len__(self):
+        return self.count
+
+
+class FixedBackoff:
+    """Wait the same number of steps after every disconnection."""
+
+    def __init__(self, steps=10):
+        self.steps = steps
+
+    def delay(self, attempt, rng=random):
+        return self.steps
+
+
+class ExponentialBackoff:
+    """Double the wait with every consecutive disconnection, up to cap."""
+
+    def __init__(self, base=2, factor=2, cap=64):
+        self.base = base
+        self.factor = factor
+        self.cap = cap
+
+    def delay(self, attempt, rng=random):
+        return min(self.cap, self.base * self.factor ** (attempt - 1))
+
+
+class JitteredBackoff:
+    """Randomize another policy's wait to spread out retry storms.
+
+    Draws uniformly from [(1 - jitter) * delay, delay], never below 1.
+    """
+
+    def __init__(self, policy=None, jitter=0.5):
+        self.policy = policy if policy is not None else ExponentialBackoff()
+        self.jitter = jitter
+
+    def delay(self, attempt, rng=random):
+        delay = self.policy.delay(attempt, rng)
+        return max(1, delay - rng.randint(0, int(delay * self.jitter)))
+
+
+BACKOFFS = {
+    "fixed": FixedBackoff,
+    "exponential": ExponentialBackoff,
+    "jittered": JitteredBackoff,
+}
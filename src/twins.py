@@ -0,0 +1,154 @@
+from model import LoadBalancerModel
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import csv
+import os
+import random
+import sys
+
+# Per-step difference of the perturbed twin from its base, both run from one fork
+Divergence = namedtuple("Divergence", "step allocation_distance extra_transfers "
+                                      "extra_spawns extra_terminations user_delta")
+
+
+def fork(model, **params):
+    """Return an independent copy of model that continues exactly like it."""
+    params.setdefault("verbose", False)
+    return LoadBalancerModel.from_state(model.get_state(), **params)
+
+
+def allocation_distance(a, b):
+    """L1 distance between two models' per-server user counts."""
+    loads_a = {server_id: len(s.connected_users) for server_id, s in a.servers_by_id.items()}
+    loads_b = {server_id: len(s.connected_users) for server_id, s in b.servers_by_id.items()}
+    return sum(abs(loads_a.get(server_id, 0) - loads_b.get(server_id, 0))
+               for server_id in loads_a.keys() | loads_b.keys())
+
+
+def butterfly(rng):
+    """Perturbation that disconnects one user, chosen with rng.
+
+    Using a separate rng keeps the twin's own random stream aligned with
+    its base, so divergence comes from the perturbation alone.
+    """
+    def perturb(model):
+        if model.server_agents:
+            rng.choice(model.server_agents).trigger_butterfly_effect(rng)
+    return perturb
+
+
+class TwinRun:
+    """An unperturbed base and a perturbed twin, stepped in lockstep.
+
+    Both are built from one get_state() capture, so many twin runs can
+    share a single capture of a running model.
+    """
+
+    def __init__(self, state, perturb=None, **params):
+        params.setdefault("verbose", False)
+        self.base = LoadBalancerModel.from_state(state, **params)
+        self.twin = LoadBalancerModel.from_state(state, **params)
+        self.fork_step = self.base.step_count
+        (perturb or butterfly(random.Random(0)))(self.twin)
+
+    def divergence(self):
+        base, twin = self.base, self.twin
+        return Divergence(
+            step=base.step_count,
+            allocation_distance=allocation_distance(base, twin),
+            extra_transfers=twin.total_transfers - base.total_transfers,
+            extra_spawns=twin.total_servers_spawned - base.total_servers_spawned,
+            extra_terminations=twin.total_servers_died - base.total_servers_died,
+            user_delta=twin.get_user_count() - base.get_user_count(),
+        )
+
+    def step(self):
+        """Advance both branches one step and return their divergence."""
+        self.base.step()
+        self.twin.step()
+        return self.divergence()
+
+    def run(self, steps):
+        return [self.step() for _ in range(steps)]
+
+
+def summarize(fork_step, divergences):
+    """Reduce one twin run's per-step divergence to a summary row."""
+    distances = [d.allocation_distance for d in divergences]
+    last = divergences[-1]
+    return {
+        "fork_step": fork_step,
+        "steps": len(divergences),
+        "max_distance": max(distances),
+        "final_distance": last.allocation_distance,
+        "steps_diverged": sum(1 for distance in distances if distance),
+        "extra_transfers": last.extra_transfers,
+        "extra_spawns": last.extra_spawns,
+        "extra_terminations": last.extra_terminations,
+    }
+
+
+def run_twin(task):
+    """Run one twin pair for horizon steps and return its summary row."""
+    state, horizon, perturb_seed = task
+    twins = TwinRun(state, butterfly(random.Random(perturb_seed)))
+    row = summarize(twins.fork_step, twins.run(horizon))
+    row["perturb_seed"] = perturb_seed
+    return row
+
+
+def run_forks(model, forks=10, interval=50, horizon=200, processes=None):
+    """Fork model every interval steps and run a twin pair from each fork.
+
+    The main run advances between forks; the twin pairs run in a process
+    pool. Returns one summary row per fork.
+    """
+    tasks = []
+    for i in range(forks):
+        if i:
+            for _ in range(interval):
+                model.step()
+        tasks.append((model.get_state(), horizon, i))
+    if processes == 1:
+        return [run_twin(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as pool:
+        return list(pool.map(run_twin, tasks))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure how far a butterfly perturbation pushes a run off course.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=200, help="steps before the first fork")
+    parser.add_argument("--forks", type=int, default=10)
+    parser.add_argument("--interval", type=int, default=50, help="main-run steps between forks")
+    parser.add_argument("--horizon", type=int, default=200, help="steps each twin pair runs")
+    parser.add_argument("--min-users", type=int, default=10)
+    parser.add_argument("--max-users", type=int, default=100)
+    parser.add_argument("--max-server-capacity", type=int, default=10)
+    parser.add_argument("--scheduler", choices=("fixed", "event"), default="fixed")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--out", default=None, help="CSV file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    model = LoadBalancerModel(seed=args.seed, verbose=False, scheduler=args.scheduler,
+                              min_users=args.min_users, max_users=args.max_users,
+                              max_server_capacity=args.max_server_capacity)
+    for _ in range(args.warmup):
+        model.step()
+    rows = run_forks(model, forks=args.forks, interval=args.interval,
+                     horizon=args.horizon, processes=args.processes)
+
+    file = open(args.out, "w", newline="") if args.out else sys.stdout
+    writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    if args.out:
+        file.close()
+        print(f"Wrote {len(rows)} forks to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+from collections import namedtuple
+import random
+
+# Read-only view of the cluster that proposals are computed against.
+# servers holds a ServerView per active, non-draining server in activation order.
+ServerView = namedtuple("ServerView", "server_id load max_capacity upper_threshold")
+ClusterView = namedtuple("ClusterView", "servers total_headroom")
+
+# A server's decision: pull (donor id, count) pairs, or terminate
+Proposal = namedtuple("Proposal", "server_id pulls needed terminate")
+
+
+def take_view(model):
+    """Snapshot the server state that proposals may read."""
+    servers = tuple(ServerView(s.unique_id, len(s.connected_users), s.max_capacity,
+                               s.upper_threshold)
+                    for s in model.server_agents if s.active and not s.draining)
+    headroom = sum(s.upper_threshold - s.load for s in servers)
+    return ClusterView(servers, headroom)
+
+
+def propose(view, me, rng):
+    """Decide what server `me` (a ServerView) wants, like ServerAgent.step would.
+
+    Returns None if the server has nothing to do. Only view and rng are
+    read, so proposals can run in any order or in parallel.
+    """
+    if me.load >= me.max_capacity * 0.3:
+        return None
+    pulls = []
+    needed = 0
+    if me.load < me.max_capacity / 2:
+        needed = remaining = me.upper_threshold - me.load
+        donors = [s for s in view.servers if s.server_id != me.server_id]
+        rng.shuffle(donors)
+        for donor in donors:
+            if remaining <= 0:
+                break
+            excess = donor.load - me.upper_threshold
+            if excess > 0:
+                count = rng.randint(0, excess)
+                if count:
+                    pulls.append((donor.server_id, count))
+                    remaining -= count
+    planned = me.load + sum(count for _, count in pulls)
+    if planned < me.max_capacity * 0.3 and len(view.servers) > 1:
+        # Can the rest of the cluster absorb this server's users?
+        own_headroom = me.upper_threshold - planned
+        if view.total_headroom - own_headroom >= planned:
+            return Proposal(me.server_id, (), needed, True)
+    if not pulls and not needed:
+        return None
+    return Proposal(me.server_id, tuple(pulls), needed, False)
+
+
+def propose_many(view, tasks):
+    """Run propose for (server id, seed) tasks against one view."""
+    by_id = {server.server_id: server for server in view.servers}
+    return [propose(view, by_id[server_id], random.Random(seed))
+            for server_id, seed in tasks if server_id in by_id]
+
+
+def commit(model, proposals):
+    """Apply proposals one at a time, re-checking each against the live state.
+
+    Donors never give away more than their current excess, and a
+    termination goes ahead only if the cluster can still take the users.
+    """
+    for proposal in proposals:
+        if proposal is None:
+            continue
+        server = model.servers_by_id.get(proposal.server_id)
+        if server is None or server.draining or server.awaiting_collab():
+            continue
+        if proposal.terminate:
+            if server.check_severe_underutilization() and server.can_others_handle_load():
+                server.distribute_users_and_terminate()
+            continue
+        server.commit_pulls(proposal.pulls, proposal.needed)
@@ -0,0 +1,410 @@
+import numpy as np
+from metrics import MetricsCollector, TERMINATED
+from events import (EventBus, ConsoleSink, DEBUG, COMM, COLLAB, TRANSFER, NEGO,
+                    BUTTERFLY, SPAWN, STEP)
+
+
+# User state codes
+DISCONNECTED = 0  # Will request a connection on its next step
+CONNECTED = 1
+WAITING = 2       # Backing off after a disconnection
+
+
+class VectorizedLoadBalancerModel:
+    """Array-based engine with the same behavior as LoadBalancerModel.
+
+    Users and servers are stored as struct-of-arrays and each step runs
+    the UserAgent/ServerAgent logic of model.py as batched NumPy
+    operations. Results match the agent model statistically, not
+    step-for-step: within a phase, all user deaths are applied before
+    all connection requests, and transfers are planned on server load
+    counts first and then applied to users in one batch.
+
+    Takes the same constructor parameters as LoadBalancerModel, plus a
+    seed for its own random generator.
+    """
+
+    def __init__(
+        self,
+        initial_users=20,
+        initial_servers=4,
+        max_server_capacity=10,
+        server_failure_chance=0.1,
+        server_up_chance=0.1,
+        max_users=100,
+        min_users=10,
+        user_spawn_chance=0.5,
+        verbose=False,
+        seed=None,
+        metrics=None
+    ):
+        self.initial_users = initial_users
+        self.server_failure_chance = server_failure_chance
+        self.server_up_chance = server_up_chance
+        self.max_server_capacity = max_server_capacity
+        self.upper_threshold = int(max_server_capacity * 0.6)
+        self.verbose = verbose
+        self.events = EventBus()
+        if verbose:
+            self.events.subscribe(ConsoleSink(), level=DEBUG)
+        self.min_users = min_users
+        self.max_users = max_users
+        self.user_spawn_chance = user_spawn_chance
+        self.rng = np.random.default_rng(seed)
+        self.metrics = metrics if metrics is not None else MetricsCollector()
+        self._reported_load = np.zeros(0, dtype=np.int64)  # Last load seen by metrics
+        self.next_user_id = initial_users + 100
+        self.next_server_id = initial_servers + 100
+
+        # User arrays, dense over the first n_users slots
+        self.n_users = 0
+        self.user_id = np.zeros(0, dtype=np.int64)
+        self.user_server = np.zeros(0, dtype=np.int64)  # Server index or -1
+        self.user_state = np.zeros(0, dtype=np.int8)
+        self.steps_alive = np.zeros(0, dtype=np.int32)
+        self.steps_to_live = np.zeros(0, dtype=np.int32)
+        self.wait_steps = np.zeros(0, dtype=np.int32)
+
+        # Server arrays; indices are stable, terminated servers stay inactive
+        self.n_servers = 0
+        self.server_id = np.zeros(0, dtype=np.int64)
+        self.server_load = np.zeros(0, dtype=np.int64)
+        self.server_active = np.zeros(0, dtype=bool)
+
+        # Counters, named as in LoadBalancerModel
+        self.step_count = 0
+        self.users_spawned_this_step = 0
+        self.users_died_this_step = 0
+        self.servers_spawned_this_step = 0
+        self.servers_died_this_step = 0
+        self.total_users_spawned = 0
+        self.total_users_died = 0
+        self.total_servers_spawned = 0
+        self.total_servers_died = 0
+        self.total_rejected_requests = 0
+        self.total_transfers = 0
+
+        self.spawn_servers(initial_servers)
+        self.spawn_users(initial_users)
+
+    # Aggregates shared with LoadBalancerModel
+
+    @property
+    def active_server_count(self):
+        return int(self.server_active[:self.n_servers].sum())
+
+    @property
+    def total_connected_users(self):
+        return int(self.server_load[:self.n_servers][self.server_active[:self.n_servers]].sum())
+
+    def pop_load_changes(self):
+        """Return (server id, load) for servers changed since the last call.
+
+        Terminated servers report TERMINATED as their load.
+        """
+        n = self.n_servers
+        current = np.where(self.server_active[:n], self.server_load[:n], TERMINATED)
+        reported = np.full(n, TERMINATED - 1, dtype=np.int64)  # New servers always differ
+        seen = min(n, len(self._reported_load))
+        reported[:seen] = self._reported_load[:seen]
+        changed = np.flatnonzero(current != reported)
+        self._reported_load = current
+        return list(zip(self.server_id[changed].tolist(), current[changed].tolist()))
+
+    def get_user_count(self):
+        """Get the number of live users."""
+        return self.n_users
+
+    def get_server_allocations(self):
+        """Get current user allocation per server."""
+        active = np.flatnonzero(self.server_active[:self.n_servers])
+        return {f"Server {self.server_id[i]}": int(self.server_load[i]) for i in active}
+
+    # Storage
+
+    @staticmethod
+    def _grow(array, size):
+        if size <= len(array):
+            return array
+        grown = np.zeros(max(size, 2 * len(array), 16), dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def spawn_users(self, count):
+        """Create count new disconnected users."""
+        if count <= 0:
+            return
+        start, end = self.n_users, self.n_users + count
+        for name in ("user_id", "user_server", "user_state",
+                     "steps_alive", "steps_to_live", "wait_steps"):
+            setattr(self, name, self._grow(getattr(self, name), end))
+        self.user_id[start:end] = np.arange(self.next_user_id, self.next_user_id + count)
+        self.user_server[start:end] = -1
+        self.user_state[start:end] = DISCONNECTED
+        self.steps_alive[start:end] = 0
+        self.steps_to_live[start:end] = self.rng.integers(10, 21, size=count)
+        self.wait_steps[start:end] = 0
+        self.n_users = end
+        self.next_user_id += count
+        self.users_spawned_this_step += count
+
+    def spawn_servers(self, count):
+        """Create count new empty servers and return their indices."""
+        start, end = self.n_servers, self.n_servers + count
+        for name in ("server_id", "server_load", "server_active"):
+            setattr(self, name, self._grow(getattr(self, name), end))
+        self.server_id[start:end] = np.arange(self.next_server_id, self.next_server_id + count)
+        self.server_load[start:end] = 0
+        self.server_active[start:end] = True
+        self.n_servers = end
+        self.next_server_id += count
+        self.servers_spawned_this_step += count
+        if self.events.enabled(SPAWN):
+            for sid in self.server_id[start:end]:
+                self.events.emit(SPAWN, server=int(sid))
+        return np.arange(start, end)
+
+    def remove_users(self, dead):
+        """Drop users flagged in the boolean mask dead (length n_users)."""
+        count = int(dead.sum())
+        if count == 0:
+            return
+        servers = self.user_server[:self.n_users][dead]
+        servers = servers[servers >= 0]
+        self.server_load[:self.n_servers] -= np.bincount(servers, minlength=self.n_servers)
+        keep = ~dead
+        end = self.n_users - count
+        for name in ("user_id", "user_server", "user_state",
+                     "steps_alive", "steps_to_live", "wait_steps"):
+            array = getattr(self, name)
+            array[:end] = array[:self.n_users][keep]
+        self.n_users = end
+        self.users_died_this_step += count
+
+    # Placement
+
+    def fill_least_loaded(self, count, allow_spawn=True):
+        """Return target server indices for count users.
+
+        Matches repeatedly handing one user to the least loaded active
+        server with room: each free slot is keyed by the load its server
+        would have when the slot is used, and the count lowest keys win.
+        Users that do not fit go to newly spawned servers.
+        """
+        targets = np.empty(count, dtype=np.int64)
+        active = np.flatnonzero(self.server_active[:self.n_servers])
+        free = np.maximum(self.max_server_capacity - self.server_load[active], 0)
+        total_free = int(free.sum())
+        taken = min(count, total_free)
+        if taken:
+            slot_server = np.repeat(active, free)
+            offsets = np.arange(total_free) - np.repeat(np.cumsum(free) - free, free)
+            keys = self.server_load[slot_server] + offsets
+            if taken < total_free:
+                chosen = np.argpartition(keys, taken - 1)[:taken]
+                slot_server = slot_server[chosen]
+            targets[:taken] = slot_server
+        rest = count - taken
+        if rest:
+            if allow_spawn:
+                new = self.spawn_servers(-(-rest // self.max_server_capacity))
+                targets[taken:] = np.repeat(new, self.max_server_capacity)[:rest]
+            else:
+                # Out of room below capacity: keep cycling through servers
+                order = active[np.argsort(self.server_load[active], kind="stable")]
+                targets[taken:] = np.resize(order, rest)
+        self.server_load[:self.n_servers] += np.bincount(targets, minlength=self.n_servers)
+        return targets
+
+    def place_requests(self, users):
+        """Connect requesting users, mirroring receive_request/balance_load."""
+        count = len(users)
+        if count == 0:
+            return
+        active = np.flatnonzero(self.server_active[:self.n_servers])
+        targets = active[self.rng.integers(len(active), size=count)]
+
+        # Each target accepts requests up to its free capacity
+        order = np.argsort(targets, kind="stable")
+        sorted_targets = targets[order]
+        rank = np.arange(count) - np.searchsorted(sorted_targets, sorted_targets)
+        accepted = rank < self.max_server_capacity - self.server_load[sorted_targets]
+        self.server_load[:self.n_servers] += np.bincount(
+            sorted_targets[accepted], minlength=self.n_servers)
+
+        # Overflow goes to the least loaded servers, spawning if needed
+        overflow = order[~accepted]
+        self.total_rejected_requests += len(overflow)
+        if len(overflow):
+            targets[overflow] = self.fill_least_loaded(len(overflow))
+        self.user_server[users] = targets
+        self.user_state[users] = CONNECTED
+        if self.events.enabled(COMM):
+            self.events.emit(COMM, count=count)
+
+    # Server phase
+
+    def server_phase(self):
+        """Run ServerAgent.step for every active server.
+
+        Decisions are taken in server order on load counts; the moves
+        they imply are applied to the user arrays at the end.
+        """
+        load = self.server_load
+        capacity = self.max_server_capacity
+        upper = self.upper_threshold
+        moves = []  # (from_server, to_server, count) in decision order
+
+        candidates = np.flatnonzero(
+            self.server_active[:self.n_servers]
+            & (load[:self.n_servers] < capacity * 0.3))
+        for s in candidates:
+            if not self.server_active[s] or not load[s] < capacity * 0.3:
+                continue
+
+            # check_utilization / request_users_from_others
+            if load[s] < capacity / 2:
+                users_needed = upper - load[s]
+                if self.events.enabled(COLLAB):
+                    self.events.emit(COLLAB, server=int(self.server_id[s]), count=int(users_needed))
+                active = self.server_active[:self.n_servers]
+                donors = np.flatnonzero(active & (load[:self.n_servers] > upper))
+                donors = donors[donors != s]
+                for d in self.rng.permutation(donors):
+                    if users_needed <= 0:
+                        break
+                    moved = int(self.rng.integers(0, load[d] - upper + 1))
+                    if moved:
+                        moves.append((d, s, moved))
+                        load[d] -= moved
+                        load[s] += moved
+                        users_needed -= moved
+
+            # can_others_handle_load / distribute_users_and_terminate
+            if load[s] < capacity * 0.3:
+                active = self.server_active[:self.n_servers]
+                others = int(active.sum()) - 1
+                if others <= 0:
+                    continue
+                headroom = others * upper - (int(load[:self.n_servers][active].sum()) - load[s])
+                if headroom < load[s]:
+                    continue
+                if self.events.enabled(NEGO):
+                    self.events.emit(NEGO, server=int(self.server_id[s]))
+                self.server_active[s] = False
+                count = int(load[s])
+                load[s] = 0
+                if count:
+                    targets = self.fill_least_loaded(count, allow_spawn=False)
+                    receivers, counts = np.unique(targets, return_counts=True)
+                    moves.extend((s, r, int(c)) for r, c in zip(receivers, counts))
+                self.servers_died_this_step += 1
+
+        self.apply_moves(moves)
+
+    def apply_moves(self, moves):
+        """Reassign random users along planned (from, to, count) moves."""
+        if not moves:
+            return
+        donors = np.unique([m[0] for m in moves])
+        servers = self.user_server[:self.n_users]
+        members = np.flatnonzero(np.isin(servers, donors))
+        members = members[self.rng.permutation(len(members))]
+        members = members[np.argsort(servers[members], kind="stable")]
+        bounds = np.searchsorted(servers[members], donors)
+        bounds = np.append(bounds, len(members))
+        pools = {int(d): list(members[bounds[i]:bounds[i + 1]])
+                 for i, d in enumerate(donors)}
+
+        for source, target, count in moves:
+            pool = pools[int(source)]
+            taken = pool[-count:]
+            del pool[-count:]
+            self.user_server[taken] = target
+            if int(target) in pools:
+                pools[int(target)].extend(taken)
+        moved = sum(m[2] for m in moves)
+        self.total_transfers += moved
+        if self.events.enabled(TRANSFER):
+            self.events.emit(TRANSFER, count=moved)
+
+    # Model loop
+
+    def maintain_population(self):
+        """Check and maintain user population within bounds."""
+        current_users = self.n_users
+        if current_users < self.min_users:
+            self.spawn_users(self.min_users - current_users)
+        elif current_users < self.max_users and self.rng.random() < self.user_spawn_chance:
+            self.spawn_users(1)
+        elif current_users > self.max_users:
+            dead = np.zeros(self.n_users, dtype=bool)
+            dead[self.rng.integers(self.n_users)] = True
+            self.remove_users(dead)
+
+    def user_phase(self):
+        """Run UserAgent.step for every user."""
+        n = self.n_users
+        state = self.user_state[:n]
+        requesting = state == DISCONNECTED
+        waiting = state == WAITING
+        connected = state == CONNECTED
+
+        # Count down the backoff; retry on the next step
+        self.wait_steps[:n][waiting] -= 1
+        state[waiting & (self.wait_steps[:n] <= 0)] = DISCONNECTED
+
+        # Connected users age and die at the end of their lifetime.
+        # Servers are never inactive while users are still on them, so
+        # check_connection has nothing to disconnect here.
+        self.steps_alive[:n][connected] += 1
+        dead = connected & (self.steps_alive[:n] >= self.steps_to_live[:n])
+
+        # Deaths free capacity before the requests are placed
+        self.remove_users(dead)
+        self.place_requests(np.flatnonzero(requesting[~dead]))
+
+    def trigger_butterfly_effect(self):
+        """Disconnect one random user from a random active server."""
+        active = np.flatnonzero(self.server_active[:self.n_servers] & (self.server_load[:self.n_servers] > 0))
+        if len(active) == 0:
+            return
+        server = active[self.rng.integers(len(active))]
+        users = np.flatnonzero(self.user_server[:self.n_users] == server)
+        user = users[self.rng.integers(len(users))]
+        self.user_server[user] = -1
+        self.user_state[user] = WAITING
+        self.wait_steps[user] = 10
+        self.server_load[server] -= 1
+        if self.events.enabled(BUTTERFLY):
+            self.events.emit(BUTTERFLY, user=int(self.user_id[user]),
+                             server=int(self.server_id[server]))
+
+    def step(self):
+        """Execute one model step."""
+        self.maintain_population()
+        self.user_phase()
+        self.server_phase()
+
+        self.total_users_spawned += self.users_spawned_this_step
+        self.total_users_died += self.users_died_this_step
+        self.total_servers_spawned += self.servers_spawned_this_step
+        self.total_servers_died += self.servers_died_this_step
+        self.metrics.collect(self)
+        self.step_count += 1
+
+        self.events.step = self.step_count
+        if self.events.enabled(STEP):
+            self.events.emit(STEP, data={
+                "Total Users": self.n_users,
+                "Server Allocations": self.get_server_allocations(),
+                "New Users": self.users_spawned_this_step,
+                "Dead Users": self.users_died_this_step,
+                "New Servers": self.servers_spawned_this_step,
+                "Dead Servers": self.servers_died_this_step,
+            })
+
+        self.users_spawned_this_step = 0
+        self.users_died_this_step = 0
+        self.servers_spawned_this_step = 0
+        self.servers_died_this_step = 0
@@ -1,9 +1,34 @@
 import pygame
 import math
 import pygame.surface
+from collections import OrderedDict
+from events import format_event
 
 
 
+class SurfaceCache:
+    """Bounded cache of rendered surfaces; least recently used first out."""
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self._surfaces = OrderedDict()
+
+    def get(self, key, build):
+        """Return the surface for key, calling build() on a miss."""
+        surface = self._surfaces.get(key)
+        if surface is None:
+            surface = build()
+            self._surfaces[key] = surface
+            if len(self._surfaces) > self.maxsize:
+                self._surfaces.popitem(last=False)
+        else:
+            self._surfaces.move_to_end(key)
+        return surface
+
+    def __len__(self):
+        return len(self._surfaces)
+
+
 class HistoryWindow:
     def __init__(self, width, height):
         self.width = width
@@ -35,16 +60,24 @@ class HistoryWindow:
             pygame.display.quit()
             self.window = None
 
+def heat_color(fraction):
+    """Green at no load through yellow to red at full load."""
+    fraction = min(max(fraction, 0.0), 1.0)
+    if fraction < 0.5:
+        return (int(460 * fraction), 160 + int(80 * fraction), 0)
+    return (230 + int(50 * (fraction - 0.5)), int(400 * (1 - fraction)), 0)
+
+
 class NetworkVisualizer:
-    def __init__(self, width=1200, height=600):
+    def __init__(self, width=1200, height=600, lod_threshold=300):
         pygame.init()
         self.width = width
         self.height = height
+        self.lod_threshold = lod_threshold  # Above this many users, draw aggregates
         self.previous_frame = None
         self.history_window = HistoryWindow(width, height)
         self.screen = pygame.display.set_mode((width, height))
         pygame.display.set_caption("Load Balancer Visualization")
-        self.message_log = []  # Store last N messages
         self.max_messages = 16  # Number of messages to show
         
         # Colors
@@ -59,6 +92,21 @@ class NetworkVisualizer:
         
         # Fonts
         self.font = pygame.font.Font(None, 24)
+        self.text_cache = SurfaceCache()
+        self.sprite_cache = SurfaceCache(4096)
+
+        # Screen regions, each redrawn only when its content changes.
+        # The graph panel stops above the button row; the log sits bottom right.
+        log_top = self.height - (self.max_messages * 25) - 60  # Above buttons
+        self.graph_rect = pygame.Rect(0, 0, self.width - 500, self.height - 70)
+        self.log_rect = pygame.Rect(self.width - 500, log_top, 500, self.max_messages * 25)
+
+        self._layout_key = None
+        self._server_layout = []
+        self._user_layout = []
+        self._last_graph = None
+        self._last_events = None
+        self._needs_full_redraw = True
 
     def draw_legend(self, screen):
         # Legend position and settings
@@ -70,99 +118,188 @@ class NetworkVisualizer:
         
         # Draw User legend
         pygame.draw.circle(screen, self.BLUE, (legend_x, legend_y), circle_radius)
-        user_text = self.font.render("User", True, self.BLACK)
+        user_text = self.text("User", self.BLACK)
         screen.blit(user_text, (legend_x + text_offset, legend_y - circle_radius))
         
         # Draw Server legend
         pygame.draw.circle(screen, self.GREEN, (legend_x, legend_y + line_height), circle_radius)
-        server_text = self.font.render("Server", True, self.BLACK)
+        server_text = self.text("Server", self.BLACK)
         screen.blit(server_text, (legend_x + text_offset, legend_y + line_height - circle_radius))
 
+    def text(self, text, color):
+        """Render text, reusing the surface when the same text was drawn before."""
+        return self.text_cache.get((text, color), lambda: self.font.render(text, True, color))
+
+    def server_sprite(self, server_id, load, active):
+        """Server circle with its label and load, cached as one surface."""
+        def build():
+            sprite = pygame.Surface((60, 60), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, self.GREEN if active else self.RED, (30, 30), 30)
+            label = self.text(f"S{server_id}", self.WHITE)
+            sprite.blit(label, label.get_rect(center=(30, 30)))
+            load_text = self.text(f"{load}", self.WHITE)
+            sprite.blit(load_text, load_text.get_rect(center=(30, 50)))
+            return sprite
+        return self.sprite_cache.get((server_id, load, active), build)
+
+    def aggregate_sprite(self, server_id, load, active, capacity, radius):
+        """Heat-coloured server with a load bar, labelled only if it fits."""
+        def build():
+            size = 2 * radius
+            sprite = pygame.Surface((size, size + 6), pygame.SRCALPHA)
+            color = heat_color(load / capacity) if active else self.GRAY
+            pygame.draw.circle(sprite, color, (radius, radius), radius)
+            bar = int(size * min(load, capacity) / capacity)
+            pygame.draw.rect(sprite, self.GRAY, (0, size + 2, size, 4))
+            pygame.draw.rect(sprite, color, (0, size + 2, bar, 4))
+            if radius >= 15:
+                label = self.text(f"S{server_id}", self.BLACK)
+                sprite.blit(label, label.get_rect(center=(radius, radius - radius // 3)))
+                load_text = self.text(f"{load}", self.BLACK)
+                sprite.blit(load_text, load_text.get_rect(center=(radius, radius + radius // 2)))
+            return sprite
+        return self.sprite_cache.get((server_id, load, active, capacity, radius), build)
+
     def capture_frame(self):
-        """Capture current frame."""
+        """Capture current frame, e.g. for the history window."""
         self.previous_frame = self.screen.copy()
-        
-    def add_log_message(self, message):
-        """Add message to log with timestamp."""
-        self.message_log.append(message)
-        if len(self.message_log) > self.max_messages:
-            self.message_log.pop(0)
-            
 
-    def draw(self, model):
-        # Capture frame before drawing new one
-        self.capture_frame()
+    def invalidate(self):
+        """Force the next draw to repaint the whole screen."""
+        self._needs_full_redraw = True
 
-        self.screen.fill(self.WHITE)
-        
-        # Calculate server positions in a circle
-        server_count = len(model.server_agents)
-        if server_count > 0:
+    def layout(self, server_count, user_count):
+        """Return (server positions, user positions), recomputed only when counts change."""
+        key = (server_count, user_count)
+        if key != self._layout_key:
             radius = min(self.width, self.height) * 0.3
+            small_radius = radius * 0.5
             center = (self.width // 3, self.height // 2)
-            
-            # Draw servers
-            server_positions = {}
-            for i, server in enumerate(model.server_agents):
-                angle = 2 * math.pi * i / server_count
-                x = center[0] + radius * math.cos(angle)
-                y = center[1] + radius * math.sin(angle)
-                server_positions[server.unique_id] = (int(x), int(y))
-                
-            
-            # Draw users and connections
-            user_radius = 10
-            for i, user in enumerate(model.user_agents):
-                # Calculate user position (spread around the center)
-                angle = 2 * math.pi * i / len(model.user_agents)
-                small_radius = radius * 0.5
-                x = center[0] + small_radius * math.cos(angle)
-                y = center[1] + small_radius * math.sin(angle)
-                
-                # Draw connection line if connected
-                if user.connected_to is not None and user.connected_to in server_positions:
-                    server_pos = server_positions[user.connected_to]
-                    pygame.draw.line(self.screen, self.ORANGE, (int(x), int(y)), server_pos, 2)
-                
-                # Draw user
-                color = self.BLUE if user.connected_to is not None else self.GRAY
-                pygame.draw.circle(self.screen, color, (int(x), int(y)), user_radius)
-            
-            # Draw the rest of servers
-            for i, server in enumerate(model.server_agents):
-                x, y = server_positions[server.unique_id]
-                # Draw server
-                color = self.GREEN if server.active else self.RED
-                pygame.draw.circle(self.screen, color, (int(x), int(y)), 30)
-                
-                # Draw server label
-                text = self.font.render(f"S{server.unique_id}", True, self.WHITE)
-                text_rect = text.get_rect(center=(int(x), int(y)))
-                self.screen.blit(text, text_rect)
-                
-                # Draw load
-                load_text = self.font.render(f"{len(server.connected_users)}", True, self.WHITE)
-                load_rect = load_text.get_rect(center=(int(x), int(y) + 20))
-                self.screen.blit(load_text, load_rect)
-        
+            self._server_layout = [
+                (int(center[0] + radius * math.cos(2 * math.pi * i / server_count)),
+                 int(center[1] + radius * math.sin(2 * math.pi * i / server_count)))
+                for i in range(server_count)
+            ]
+            self._user_layout = [
+                (int(center[0] + small_radius * math.cos(2 * math.pi * i / user_count)),
+                 int(center[1] + small_radius * math.sin(2 * math.pi * i / user_count)))
+                for i in range(user_count)
+            ]
+            self._layout_key = key
+        return self._server_layout, self._user_layout
+
+    def draw(self, snapshot):
+        """Render a Snapshot and return the screen rects that changed.
+
+        Pass the rects to pygame.display.update. Panels whose content is
+        unchanged since the last call are left alone.
+        """
+        dirty = []
+        if self._needs_full_redraw:
+            self.screen.fill(self.WHITE)
+            self.draw_legend(self.screen)
+            self._last_graph = self._last_events = None
+            self._needs_full_redraw = False
+            dirty.append(self.screen.get_rect())
+
+        graph = (snapshot.step, snapshot.servers, snapshot.links)
+        if graph != self._last_graph:
+            self.draw_graph(snapshot)
+            self._last_graph = graph
+            dirty.append(self.graph_rect)
+
+        if snapshot.events != self._last_events:
+            self.draw_log(snapshot.events)
+            self._last_events = snapshot.events
+            dirty.append(self.log_rect)
+        return dirty
+
+    def draw_graph(self, snapshot):
+        self.screen.set_clip(self.graph_rect)
+        self.screen.fill(self.WHITE)
+        if snapshot.user_count > self.lod_threshold:
+            self.draw_aggregate(snapshot)
+        else:
+            self.draw_users(snapshot)
+
         # Draw stats
         stats = [
-            f"Users: {len(model.user_agents)}",
-            f"Servers: {len([s for s in model.server_agents if s.active])}",
-            f"Step: {model.step_count}"
+            f"Users: {snapshot.user_count}",
+            f"Servers: {snapshot.active_servers}",
+            f"Step: {snapshot.step}"
         ]
-        
+        if len(snapshot.links) < snapshot.user_count:
+            stats.append(f"Showing {len(snapshot.links)} sampled users")
         for i, stat in enumerate(stats):
-            text = self.font.render(stat, True, self.BLACK)
+            text = self.text(stat, self.BLACK)
             self.screen.blit(text, (10, 10 + i * 25))
-        
+        self.screen.set_clip(None)
+
+    def draw_users(self, snapshot):
+        """One dot and one edge per user."""
+        server_layout, user_layout = self.layout(len(snapshot.servers), len(snapshot.links))
+        server_positions = {server_id: pos for (server_id, _, _), pos
+                            in zip(snapshot.servers, server_layout)}
+
+        # Draw users and connections
+        user_radius = 10
+        for connected_to, pos in zip(snapshot.links, user_layout):
+            # Draw connection line if connected
+            if connected_to is not None and connected_to in server_positions:
+                pygame.draw.line(self.screen, self.ORANGE, pos, server_positions[connected_to], 2)
+
+            # Draw user
+            color = self.BLUE if connected_to is not None else self.GRAY
+            pygame.draw.circle(self.screen, color, pos, user_radius)
+
+        # Draw the rest of servers
+        for (server_id, load, active), (x, y) in zip(snapshot.servers, server_layout):
+            # Draw server with its label and load
+            self.screen.blit(self.server_sprite(server_id, load, active), (x - 30, y - 30))
+
+    def draw_aggregate(self, snapshot):
+        """Per-server bundles and heat instead of per-user edges; O(servers + sample)."""
+        server_layout, user_layout = self.layout(len(snapshot.servers), len(snapshot.links))
+        cx, cy = self.width // 3, self.height // 2
+        capacity = max(1, snapshot.capacity)
+
+        # Shrink servers so the ring does not overlap itself
+        ring = 2 * math.pi * min(self.width, self.height) * 0.3
+        radius = int(min(30, max(4, ring / (2.5 * max(1, len(snapshot.servers))))))
+
+        # One bundled edge per server, from the user ring out to the server,
+        # as thick as its load
+        heaviest = max((load for _, load, _ in snapshot.servers), default=0) or 1
+        widest = int(max(1, min(12, radius, ring / 2 / max(1, len(snapshot.servers)))))
+        positions = {}
+        for (server_id, load, active), (x, y) in zip(snapshot.servers, server_layout):
+            positions[server_id] = (x, y)
+            if load and active:
+                inner = (cx + (x - cx) // 2, cy + (y - cy) // 2)
+                pygame.draw.line(self.screen, self.ORANGE, inner, (x, y),
+                                 max(1, widest * load // heaviest))
+
+        # Sampled users as small dots: along their server's bundle, or on
+        # the user ring if disconnected
+        for i, (connected_to, pos) in enumerate(zip(snapshot.links, user_layout)):
+            if connected_to in positions:
+                x, y = positions[connected_to]
+                t = 0.55 + 0.3 * ((i * 0.618034) % 1)
+                pygame.draw.circle(self.screen, self.BLUE,
+                                   (int(cx + (x - cx) * t), int(cy + (y - cy) * t)), 2)
+            else:
+                pygame.draw.circle(self.screen, self.GRAY, pos, 2)
+
+        for (server_id, load, active), (x, y) in zip(snapshot.servers, server_layout):
+            sprite = self.aggregate_sprite(server_id, load, active, capacity, radius)
+            self.screen.blit(sprite, (x - radius, y - radius))
+
+    def draw_log(self, events):
         # Draw message log in bottom right
-        start_y = self.height - (self.max_messages * 25) - 60  # Above buttons
-        for i, msg in enumerate(self.message_log):
-            text = self.font.render(msg, True, self.BLACK)
-            self.screen.blit(text, (self.width - 500, start_y + i * 25))
-        
-        self.draw_legend(self.screen)
+        self.screen.fill(self.WHITE, self.log_rect)
+        for i, event in enumerate(events[-self.max_messages:]):
+            text = self.text(format_event(event), self.BLACK)
+            self.screen.blit(text, (self.log_rect.x, self.log_rect.y + i * 25))
 
     def close(self):
         pygame.quit()
\ No newline at end of file
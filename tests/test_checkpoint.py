@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from model import LoadBalancerModel  # noqa: E402
+
+
+def trace(model, steps):
+    """Per-step counts and connections, with a butterfly every 13 steps."""
+    rows = []
+    for i in range(steps):
+        model.step()
+        if i % 13 == 0:
+            model.server_agents[0].trigger_butterfly_effect()
+        rows.append((model.step_count, model.get_user_count(), model.total_transfers,
+                     model.total_servers_spawned, model.total_servers_died,
+                     [(s.unique_id, sorted(u.unique_id for u in s.connected_users))
+                      for s in model.server_agents]))
+    return rows
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"scheduler": "event"},
+    {"messaging": "mailbox", "latency": 2},
+    {"rebalance": "bulk"},
+    {"server_phase": "two_phase"},
+])
+def test_restored_model_continues_like_the_original(params):
+    model = LoadBalancerModel(seed=3, verbose=False, initial_users=100, min_users=80,
+                              max_users=200, initial_servers=6, **params)
+    trace(model, 60)
+    restored = LoadBalancerModel.from_state(model.get_state(), verbose=False)
+
+    assert trace(restored, 100) == trace(model, 100)
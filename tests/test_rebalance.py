@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from model import LoadBalancerModel  # noqa: E402
+
+
+@pytest.mark.parametrize("messaging", ["direct", "mailbox"])
+def test_bulk_moves_split_one_donor_across_receivers(messaging):
+    model = LoadBalancerModel(seed=0, verbose=False, initial_users=0, initial_servers=3,
+                              max_server_capacity=100, messaging=messaging, rebalance="bulk")
+    donor, first, second = model.server_agents
+    for server, users in ((donor, 100), (first, 25)):
+        for _ in range(users):
+            server.connect_user(model.spawn_user())
+
+    moves = model.plan_moves([first, second])
+    assert [(d, r, count) for d, r, count in moves] == [(donor, first, 35), (donor, second, 5)]
+    model.apply_moves(moves)
+    model.deliver_messages()  # Hands over the TRANSFERs in mailbox mode
+
+    assert [len(s.connected_users) for s in (donor, first, second)] == [60, 60, 5]
+    assert model.total_transfers == 40
+    for server in (donor, first, second):
+        assert all(user.connected_to == server.unique_id for user in server.connected_users)
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from model import LoadBalancerModel  # noqa: E402
+
+
+def trace(scheduler, seed, steps=400):
+    """Per-step counts of a seeded run with a butterfly every 23 steps."""
+    model = LoadBalancerModel(seed=seed, verbose=False, scheduler=scheduler, min_users=100,
+                              max_users=300, max_server_capacity=10)
+    rows = []
+    for i in range(steps):
+        model.step()
+        if i % 23 == 5:
+            server = model.random.choice(model.server_agents)
+            for _ in range(3):
+                server.trigger_butterfly_effect()
+        rows.append((model.get_user_count(), model.total_connected_users,
+                     model.active_server_count, model.total_transfers,
+                     model.total_servers_died))
+    return rows
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_event_scheduler_matches_fixed_steps(seed):
+    assert trace("event", seed) == trace("fixed", seed)